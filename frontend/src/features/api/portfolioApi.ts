@@ -15,7 +15,7 @@ export const portfolioApi = createApi({
   endpoints: (b) => ({
     login: b.mutation<{access:string;refresh:string}, {username:string;password:string}>({ query: (body) => ({ url: 'auth/token/', method: 'POST', body }) }),
     me: b.query<any, void>({ query: () => 'accounts/me/' }),
-    boards: b.query<any[], void>({ query: () => 'tracker/boards/' }),
+    boards: b.query<any[], void>({ query: () => 'tracker/boards/', transformResponse: (r: any) => r.results ?? r }),
     createBoard: b.mutation<any, Partial<any>>({ query: (body) => ({ url: 'tracker/boards/', method: 'POST', body }) }),
     moveCard: b.mutation<any, {id:number; column:number; position:number}>({ query: ({id, ...body}) => ({ url: `tracker/cards/${id}/move/`, method: 'POST', body }) }),
     generatePlan: b.mutation<any, {name:string;start_date:string;weeks:number}>({ query: (body) => ({ url: 'training/plans/generate/', method: 'POST', body }) }),
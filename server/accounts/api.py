@@ -1,9 +1,15 @@
 from rest_framework import routers, viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from django.urls import path, include
 from django.contrib.auth.models import User
 from .serializers import UserSerializer
+from .auth import revoke_tokens
 class MeViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = User.objects.all(); serializer_class = UserSerializer; permission_classes = [permissions.IsAuthenticated]
-    def get_queryset(self): return User.objects.filter(id=self.request.user.id)
+    queryset = User.objects.all(); serializer_class = UserSerializer; permission_classes = [permissions.IsAuthenticated]; pagination_class = None
+    def get_queryset(self): return User.objects.filter(id=self.request.user.id).select_related("profile")
+    def list(self, request): return Response([self.get_serializer(request.user).data])
+    @action(detail=False, methods=["post"])
+    def revoke(self, request): return Response({"token_version": revoke_tokens(request.user)})
 router = routers.DefaultRouter(); router.register(r"me", MeViewSet, basename="me")
 urlpatterns = [path("", include(router.urls))]
@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import F
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .models import Profile
+VERSION_CLAIM="ver"
+def backend(): return caches[getattr(settings, "AUTH_CACHE", "default")]
+def shared(): return not isinstance(backend(), (LocMemCache, DummyCache))
+def principal_key(user_id, version): return f"auth:principal:{user_id}:{version}"
+def floor_key(user_id): return f"auth:min-version:{user_id}"
+def token_version(user):
+    try: return user.profile.token_version
+    except Profile.DoesNotExist: return 0
+def load_principal(user_id, version, cached=True):
+    key=principal_key(user_id, version); user=backend().get(key) if cached else None
+    if user is None:
+        user=User.objects.select_related("profile").filter(pk=user_id).first()
+        if user is None or token_version(user)!=version: return None
+        backend().set(key, user, getattr(settings, "AUTH_CACHE_TTL", 300))
+    return user
+def invalidate(user_id, version=None):
+    if version is None: version=Profile.objects.filter(user_id=user_id).values_list("token_version", flat=True).first() or 0
+    drop=lambda: backend().delete(principal_key(user_id, version))
+    drop(); transaction.on_commit(drop)
+def revoke_tokens(user):
+    profile,_=Profile.objects.get_or_create(user=user); old=profile.token_version
+    Profile.objects.filter(pk=profile.pk).update(token_version=F("token_version")+1)
+    backend().set(floor_key(user.pk), old+1, int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()))
+    invalidate(user.pk, old)
+    return old+1
+def check_version(token):
+    user_id, version = token[api_settings.USER_ID_CLAIM], token.get(VERSION_CLAIM, 0)
+    floor=backend().get(floor_key(user_id))
+    if floor is not None and version < floor: raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+    return user_id, version
+class CachedJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        header=self.get_header(request)
+        if header is None: return None
+        raw=self.get_raw_token(header)
+        if raw is None: return None
+        token=self.get_validated_token(raw)
+        view=(getattr(request, "parser_context", None) or {}).get("view")
+        if request.method in SAFE_METHODS and getattr(view, "trust_token_claims", False): return self.claims_user(token), token
+        return self.get_user(token, cached=request.method in SAFE_METHODS or shared()), token
+    def get_user(self, validated_token, cached=True):
+        try: user_id, version = check_version(validated_token)
+        except KeyError: raise InvalidToken("Token contained no recognizable user identification")
+        user=load_principal(user_id, version, cached)
+        if user is None: raise AuthenticationFailed("User not found or token revoked", code="user_not_found")
+        if not user.is_active: raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
+    def claims_user(self, validated_token):
+        try: user_id, version = check_version(validated_token)
+        except KeyError: raise InvalidToken("Token contained no recognizable user identification")
+        user=backend().get(principal_key(user_id, version))
+        if user is None: return self.get_user(validated_token)
+        if not user.is_active: raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
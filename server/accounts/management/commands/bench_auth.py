@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from accounts.api import MeViewSet
+from accounts.auth import CachedJWTAuthentication
+from accounts.models import Profile
+from accounts.serializers import VersionedTokenObtainPairSerializer
+from training.api import WorkoutViewSet, MetricViewSet, StatsViewSet
+from project_tracker.api import BoardViewSet
+from shop.api import OrderViewSet
+ENDPOINTS=(("me", MeViewSet), ("workouts", WorkoutViewSet), ("metrics", MetricViewSet), ("stats", StatsViewSet), ("boards", BoardViewSet), ("orders", OrderViewSet))
+class Command(BaseCommand):
+    help = "Compare per-request queries and latency of stock vs cached JWT auth on hot list endpoints. All writes are rolled back."
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+    def measure(self, viewset, auth, token, n):
+        view=viewset.as_view({"get": "list"}, authentication_classes=[auth]); factory=APIRequestFactory()
+        request=lambda: factory.get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        view(request())
+        with CaptureQueriesContext(connection) as ctx: response=view(request())
+        assert response.status_code==200, response.status_code
+        t=time.perf_counter()
+        for _ in range(n): view(request())
+        return len(ctx.captured_queries), (time.perf_counter()-t)/n*1000
+    def handle(self, *args, **o):
+        with transaction.atomic():
+            user,_=User.objects.get_or_create(username="bench-auth"); Profile.objects.get_or_create(user=user)
+            token=str(VersionedTokenObtainPairSerializer.get_token(user).access_token)
+            self.stdout.write(f"{'endpoint':>10} {'stock q':>8} {'stock ms':>9} {'cached q':>9} {'cached ms':>10}")
+            for name, viewset in ENDPOINTS:
+                sq, sms = self.measure(viewset, JWTAuthentication, token, o["requests"])
+                cq, cms = self.measure(viewset, CachedJWTAuthentication, token, o["requests"])
+                self.stdout.write(f"{name:>10} {sq:>8} {sms:>9.2f} {cq:>9} {cms:>10.2f}")
+            transaction.set_rollback(True)
@@ -1,7 +1,16 @@
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
     display_name = models.CharField(max_length=120, blank=True)
     role = models.CharField(max_length=50, default="user")
+    token_version = models.PositiveIntegerField(default=0)
     def __str__(self): return self.display_name or self.user.username
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=Profile)
+def invalidate_principal(sender, instance, **kwargs):
+    from .auth import invalidate
+    if sender is Profile: invalidate(instance.user_id, instance.token_version)
+    else: invalidate(instance.pk)
@@ -1,8 +1,22 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
 from .models import Profile
+from .auth import VERSION_CLAIM, check_version, load_principal, shared, token_version
 class ProfileSerializer(serializers.ModelSerializer):
     class Meta: model = Profile; fields = ["display_name","role"]
 class UserSerializer(serializers.ModelSerializer):
     profile = ProfileSerializer(read_only=True)
     class Meta: model = User; fields = ["id","username","email","first_name","last_name","profile"]
+class VersionedTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user); token[VERSION_CLAIM] = token_version(user); token["username"] = user.username
+        return token
+class VersionedTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        user_id, version = check_version(RefreshToken(attrs["refresh"]))
+        if load_principal(user_id, version, cached=shared()) is None: raise serializers.ValidationError({"refresh": ["token revoked"]})
+        return data
@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase
+from rest_framework.test import APIClient
+from .models import Profile
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user=User.objects.create_user("runner", password="pw"); Profile.objects.create(user=self.user); self.client=APIClient()
+        tokens=self.client.post("/api/auth/token/", {"username": "runner", "password": "pw"}).data; self.refresh=tokens["refresh"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+    def read(self): return self.client.get("/api/training/metrics/").status_code
+    def write(self): return self.client.post("/api/training/metrics/", {"date": "2024-05-01", "rhr_bpm": 50}, format="json").status_code
+    def test_valid_token(self):
+        self.assertEqual(self.read(), 200); self.assertEqual(self.write(), 201)
+    def test_revoke(self):
+        self.assertEqual(self.read(), 200)
+        self.assertEqual(self.client.post("/api/accounts/me/revoke/").status_code, 200)
+        self.assertEqual(self.read(), 401); self.assertEqual(self.write(), 401)
+        cache.clear()
+        self.assertEqual(self.read(), 401); self.assertEqual(self.write(), 401)
+        self.assertEqual(self.client.get("/api/accounts/me/").status_code, 401)
+    def test_inactive_user(self):
+        self.assertEqual(self.read(), 200)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.write(), 401)
+        cache.clear(); self.assertEqual(self.read(), 401)
+    def test_token_minted_before_version_bump(self):
+        self.assertEqual(self.read(), 200)
+        Profile.objects.filter(user=self.user).update(token_version=F("token_version")+1)
+        self.assertEqual(self.write(), 401)
+        self.assertEqual(self.client.post("/api/auth/refresh/", {"refresh": self.refresh}).status_code, 400)
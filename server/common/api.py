@@ -0,0 +1,33 @@
+from rest_framework import viewsets, permissions, routers, serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.http import HttpResponse
+from django.urls import path, include
+from .audit import AuditLog, history
+from .metrics import registry
+class AuditLogSerializer(serializers.ModelSerializer):
+    class Meta: model = AuditLog; fields = ["id","actor","action","entity","entity_id","payload","created_at"]
+class AuditViewSet(viewsets.ViewSet):
+    permission_classes=[permissions.IsAdminUser]
+    def list(self, request):
+        p = request.query_params
+        if not p.get("entity") or not p.get("entity_id", "").isdigit(): raise ValidationError({"entity": ["entity and numeric entity_id are required"]})
+        limit = p.get("limit", "50")
+        if not limit.isdigit() or int(limit) < 1: raise ValidationError({"limit": ["expected a positive integer"]})
+        try: rows, cursor = history(p["entity"], int(p["entity_id"]), p.get("cursor"), min(int(limit), 500))
+        except ValueError: raise ValidationError({"cursor": ["invalid cursor"]})
+        return Response({"next": cursor, "results": AuditLogSerializer(rows, many=True).data})
+class MetricsView(APIView):
+    permission_classes=[permissions.IsAdminUser]
+    def get(self, request): return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+class SlowRequestsView(APIView):
+    permission_classes=[permissions.IsAdminUser]
+    def get(self, request): return Response(registry.slow_requests())
+router=routers.DefaultRouter()
+router.register(r"audit", AuditViewSet, basename="audit")
+urlpatterns=[
+    path("metrics", MetricsView.as_view(), name="metrics"),
+    path("metrics/slow/", SlowRequestsView.as_view(), name="metrics-slow"),
+    path("", include(router.urls)),
+]
@@ -1,7 +1,13 @@
-from django.db import models
+import atexit, base64, logging, queue, threading, time
+from datetime import datetime
+from functools import lru_cache
+from django.conf import settings
+from django.db import close_old_connections, connection, models
+from django.db.models import Q
 from django.contrib.auth import get_user_model
 from django.utils.timezone import now
 User = get_user_model()
+logger = logging.getLogger(__name__)
 class AuditLog(models.Model):
     actor = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
     action = models.CharField(max_length=50)
@@ -9,4 +15,66 @@ class AuditLog(models.Model):
     entity_id = models.IntegerField()
     payload = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(default=now, db_index=True)
-    class Meta: ordering = ["-created_at"]
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["entity","entity_id","created_at"], name="audit_entity_history")]
+class AuditWriter:
+    def __init__(self, batch_size=200, interval=1.0, maxsize=10000, overflow="drop", block_timeout=0.05):
+        self.batch_size=batch_size; self.interval=interval; self.overflow=overflow; self.block_timeout=block_timeout
+        self.queue=queue.Queue(maxsize); self.dropped=0; self.written=0
+        self._thread=None; self._lock=threading.Lock(); self._stop=threading.Event()
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        with self._lock:
+            if self._thread and self._thread.is_alive(): return
+            first=self._thread is None
+            self._thread=threading.Thread(target=self._run, name="audit-writer", daemon=True); self._thread.start()
+            if first: atexit.register(self.close)
+    def put(self, entry):
+        self.start()
+        try:
+            if self.overflow=="block": self.queue.put(entry, timeout=self.block_timeout)
+            else: self.queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            with self._lock: self.dropped+=1; dropped=self.dropped
+            if dropped % 1000 == 1: logger.warning("audit queue full, %d events dropped so far", dropped)
+            return False
+    def _take(self, wait):
+        batch=[]; deadline=time.monotonic()+wait
+        while len(batch) < self.batch_size:
+            try: batch.append(self.queue.get(timeout=max(deadline-time.monotonic(), 0)) if wait else self.queue.get_nowait())
+            except queue.Empty: break
+        return batch
+    def _write(self, batch):
+        try: AuditLog.objects.bulk_create(batch, batch_size=self.batch_size); self.written+=len(batch)
+        except Exception: logger.exception("audit flush failed, %d events lost", len(batch))
+    def _run(self):
+        while not self._stop.is_set():
+            batch=self._take(self.interval)
+            if batch: self._write(batch)
+            close_old_connections()
+    def flush(self):
+        while batch := self._take(0): self._write(batch)
+    def close(self):
+        self._stop.set()
+        if self._thread: self._thread.join(timeout=self.interval + 1)
+        self.flush()
+@lru_cache(maxsize=None)
+def get_writer():
+    return AuditWriter(getattr(settings,"AUDIT_BATCH_SIZE",200), getattr(settings,"AUDIT_FLUSH_INTERVAL",1.0), getattr(settings,"AUDIT_QUEUE_SIZE",10000), getattr(settings,"AUDIT_OVERFLOW","drop"))
+def record(actor, action, entity, entity_id, payload=None):
+    actor_id = actor.pk if getattr(actor, "is_authenticated", False) else None
+    entry = AuditLog(actor_id=actor_id, action=action, entity=entity, entity_id=entity_id, payload=payload or {}, created_at=now())
+    if not getattr(settings,"AUDIT_ASYNC",True) or connection.in_atomic_block: entry.save(); return True
+    return get_writer().put(entry)
+def encode_cursor(entry): return base64.urlsafe_b64encode(f"{entry.created_at.isoformat()}|{entry.pk}".encode()).decode()
+def decode_cursor(cursor):
+    ts, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(ts), int(pk)
+def history(entity, entity_id, cursor=None, limit=50):
+    qs = AuditLog.objects.filter(entity=entity, entity_id=entity_id).order_by("-created_at","-id")
+    if cursor:
+        ts, pk = decode_cursor(cursor); qs = qs.filter(Q(created_at__lt=ts) | Q(created_at=ts, id__lt=pk))
+    rows = list(qs[:limit+1])
+    return rows[:limit], (encode_cursor(rows[limit-1]) if len(rows) > limit else None)
@@ -0,0 +1,21 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+def date_param(params, name):
+    raw=params.get(name)
+    if not raw: return None
+    try: d=parse_date(raw)
+    except ValueError: d=None
+    if d is None: raise ValidationError({name: ["expected YYYY-MM-DD"]})
+    return d
+def date_range(qs, params, field="date"):
+    start, end = date_param(params, "from"), date_param(params, "to")
+    if start: qs=qs.filter(**{f"{field}__gte": start})
+    if end: qs=qs.filter(**{f"{field}__lte": end})
+    return qs
+def exact(qs, params, **fields):
+    for param, field in fields.items():
+        if not params.get(param): continue
+        try: qs=qs.filter(**{field: params[param]})
+        except (ValueError, DjangoValidationError): raise ValidationError({param: ["invalid value"]})
+    return qs
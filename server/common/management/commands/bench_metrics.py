@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from common.metrics import MetricsMiddleware
+def view(request):
+    for _ in range(view.queries): User.objects.filter(pk=0).exists()
+    return HttpResponse(b"x"*512)
+class Command(BaseCommand):
+    help = "Measure MetricsMiddleware overhead per request against a bare view."
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20000)
+        parser.add_argument("--queries", type=int, default=3, help="DB queries issued by the benchmark view")
+    def time(self, handler, n):
+        request=RequestFactory().get("/bench/"); t=time.perf_counter()
+        for _ in range(n): handler(request)
+        return (time.perf_counter()-t)/n*1e6
+    def handle(self, *args, **o):
+        n=o["requests"]; view.queries=o["queries"]; self.time(view, 200)
+        base=self.time(view, n)
+        self.stdout.write(f"{'mode':>18} {'us/request':>11} {'overhead us':>12}")
+        self.stdout.write(f"{'no middleware':>18} {base:>11.1f} {0:>12.1f}")
+        for label, rate in (("sampling off", 0.0), ("sampling 10%", 0.1), ("sampling 100%", 1.0)):
+            with override_settings(METRICS_ENABLED=True, METRICS_SAMPLE_RATE=rate, METRICS_SLOW_MS=0):
+                us=self.time(MetricsMiddleware(view), n)
+            self.stdout.write(f"{label:>18} {us:>11.1f} {us-base:>12.1f}")
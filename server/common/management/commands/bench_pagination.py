@@ -0,0 +1,44 @@
+import time
+from datetime import date, timedelta
+from urllib.parse import urlparse, parse_qs
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import transaction
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from training.models import Plan, Workout
+from common.pagination import KeysetPagination
+class View: cursor_ordering=("date","id")
+class Command(BaseCommand):
+    help = "Compare deep-page latency of offset vs keyset pagination on workouts. All writes are rolled back."
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50000)
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--depths", type=int, nargs="+", default=[1,10,100,500,990])
+    def seed(self, n):
+        owner,_=User.objects.get_or_create(username="bench-pagination")
+        plans=[Plan.objects.create(owner=owner,name=f"bench {i}",start_date=date(2000,1,1)) for i in range(max(n//5000,1))]
+        Workout.objects.bulk_create([Workout(plan=plans[i%len(plans)],date=date(2000,1,1)+timedelta(days=i//len(plans)),kind="easy",distance_km=5) for i in range(n)], batch_size=1000)
+        return Workout.objects.filter(plan__owner=owner).order_by("date","id")
+    def page(self, paginator, qs, params):
+        request=Request(APIRequestFactory().get("/api/training/workouts/", params))
+        t=time.perf_counter(); rows=paginator.paginate_queryset(qs, request, view=View()); dt=time.perf_counter()-t
+        return rows, dt, paginator
+    def handle(self, *args, **o):
+        size=o["page_size"]; depths=sorted(set(o["depths"]))
+        with transaction.atomic():
+            qs=self.seed(o["rows"]); offset_ms={}; keyset_ms={}; cursor=None
+            for d in depths:
+                _, dt, _ = self.page(LimitOffsetPagination(), qs, {"limit": size, "offset": (d-1)*size}); offset_ms[d]=dt*1000
+            keyset=KeysetPagination(); keyset.page_size=size
+            for n in range(1, depths[-1]+1):
+                rows, dt, p = self.page(keyset, qs, {"cursor": cursor} if cursor else {})
+                if n in offset_ms: keyset_ms[n]=dt*1000
+                link=p.get_next_link()
+                if not link: break
+                cursor=parse_qs(urlparse(link).query)["cursor"][0]
+            self.stdout.write(f"{'page':>6} {'offset ms':>10} {'keyset ms':>10}")
+            for d in depths:
+                self.stdout.write(f"{d:>6} {offset_ms[d]:>10.2f} {keyset_ms.get(d, float('nan')):>10.2f}")
+            transaction.set_rollback(True)
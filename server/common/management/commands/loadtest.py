@@ -0,0 +1,69 @@
+import random, statistics, threading, time
+from collections import defaultdict
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import Client
+from accounts.serializers import VersionedTokenObtainPairSerializer
+from project_tracker.models import Board, Card, Column
+from shop.models import Product
+OPS=("move","order","metric","read")
+class Command(BaseCommand):
+    help = "Drive concurrent writes through the full HTTP stack against seed_demo --users data and report throughput and tail latency."
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=20)
+        parser.add_argument("--mix", default="move=5,order=3,metric=2,read=0", help="relative op weights")
+        parser.add_argument("--seed", type=int, default=1)
+    def profile(self):
+        db=settings.DATABASES["default"]; desc=f"{connection.vendor} conn_max_age={db.get('CONN_MAX_AGE',0)}"
+        if "pool" in db.get("OPTIONS",{}): desc+=f" pool={db['OPTIONS']['pool']}"
+        if connection.vendor=="sqlite":
+            with connection.cursor() as c:
+                pragmas={p: c.execute(f"PRAGMA {p}").fetchone()[0] for p in ("journal_mode","synchronous","busy_timeout","mmap_size")}
+            desc+=" "+" ".join(f"{k}={v}" for k, v in pragmas.items())
+        return desc
+    def fixtures(self):
+        users=list(User.objects.filter(username__startswith="loadtest-"))
+        if not users: raise CommandError("no load-test users; run: manage.py seed_demo --users 8")
+        out=[]
+        for u in users:
+            columns=list(Column.objects.filter(board__owner=u).values_list("pk", flat=True))
+            out.append({"token": str(VersionedTokenObtainPairSerializer.get_token(u).access_token), "board": Board.objects.filter(owner=u).values_list("pk", flat=True).first(),
+                        "columns": columns, "cards": list(Card.objects.filter(column__in=columns).values_list("pk", flat=True))})
+        return out, list(Product.objects.filter(active=True).values_list("pk", flat=True))
+    def request(self, client, op, fx, products, rnd):
+        if op=="move": return client.post(f"/api/tracker/cards/{rnd.choice(fx['cards'])}/move/", {"column": rnd.choice(fx["columns"]), "position": rnd.randrange(len(fx["cards"])//len(fx["columns"]) or 1)}, content_type="application/json")
+        if op=="order": return client.post("/api/shop/orders/", {"items": [{"product_id": rnd.choice(products), "quantity": rnd.randint(1,3)} for _ in range(rnd.randint(1,5))]}, content_type="application/json")
+        if op=="metric": return client.post("/api/training/metrics/", {"date": str(date(2000,1,1)+timedelta(days=rnd.randrange(20000))), "rhr_bpm": rnd.randint(45,65)}, content_type="application/json")
+        return client.get(f"/api/tracker/boards/{fx['board']}/snapshot/")
+    def worker(self, n, fixtures, products, ops, weights, deadline, results):
+        rnd=random.Random(self.seed+n); fx=fixtures[n % len(fixtures)]
+        client=Client(SERVER_NAME=settings.ALLOWED_HOSTS[0], HTTP_AUTHORIZATION=f"Bearer {fx['token']}")
+        try:
+            while time.perf_counter() < deadline:
+                op=rnd.choices(ops, weights)[0]; t=time.perf_counter()
+                try: ok=self.request(client, op, fx, products, rnd).status_code < 500; err=None
+                except Exception as e: ok=False; err=type(e).__name__+": "+str(e)[:80]
+                results[op].append((time.perf_counter()-t, ok, err))
+        finally: connections.close_all()
+    def handle(self, *args, **o):
+        weights=dict((k, float(v)) for k, v in (part.split("=") for part in o["mix"].split(",")))
+        ops=[op for op in OPS if weights.get(op)]; self.seed=o["seed"]
+        if not ops: raise CommandError(f"--mix needs a positive weight for one of: {', '.join(OPS)}")
+        fixtures, products = self.fixtures(); self.stdout.write(f"profile: {self.profile()}")
+        results=defaultdict(list); deadline=time.perf_counter()+o["seconds"]
+        threads=[threading.Thread(target=self.worker, args=(n, fixtures, products, ops, [weights[op] for op in ops], deadline, results)) for n in range(o["threads"])]
+        start=time.perf_counter()
+        for t in threads: t.start()
+        for t in threads: t.join()
+        elapsed=time.perf_counter()-start
+        self.stdout.write(f"{'op':>7} {'req':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+        for op in ops:
+            rows=results[op]; lat=sorted(r[0]*1000 for r in rows); errors=[r for r in rows if not r[1]]
+            if not lat: continue
+            q=statistics.quantiles(lat, n=100) if len(lat) > 1 else lat*99
+            self.stdout.write(f"{op:>7} {len(rows):>7} {len(rows)/elapsed:>8.1f} {q[49]:>8.1f} {q[94]:>8.1f} {q[98]:>8.1f} {lat[-1]:>8.1f} {len(errors):>7}")
+            for msg in sorted({e[2] for e in errors if e[2]})[:3]: self.stdout.write(f"         {msg}")
@@ -1,8 +1,25 @@
+import random
+from datetime import date, timedelta
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from project_tracker.models import Board, Column, Card
+from django.db import transaction
+from project_tracker.models import Board, Column, Card, Comment
+from project_tracker.ranking import GAP
 from shop.models import Product
+from shop.orders import build_orders
+from training.models import Metric
+from training.services import generate_plan
+from training.stats import refresh
 class Command(BaseCommand):
+    help = "Seed the demo user, optionally plus --users load-test users with bulk data."
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=0, help="extra loadtest-N users to generate")
+        parser.add_argument("--cards", type=int, default=200, help="cards per column for generated users")
+        parser.add_argument("--comments", type=int, default=2, help="comments per card for generated users")
+        parser.add_argument("--orders", type=int, default=100, help="orders per generated user")
+        parser.add_argument("--metrics", type=int, default=365, help="daily metrics per generated user")
+        parser.add_argument("--plan-weeks", type=int, default=52)
+        parser.add_argument("--seed", type=int, default=1)
     def handle(self,*args,**kwargs):
         u,_=User.objects.get_or_create(username="demo",defaults={"email":"demo@example.com"})
         u.set_password("demo1234"); u.save()
@@ -16,3 +33,21 @@ class Command(BaseCommand):
         Product.objects.get_or_create(name="Pro Plan",price_cents=9900,active=True)
         Product.objects.get_or_create(name="Consultation",price_cents=19900,active=True)
         self.stdout.write(self.style.SUCCESS("Seeded demo data (user: demo / pass: demo1234)"))
+        if kwargs["users"]: self.seed_volume(kwargs)
+    def seed_volume(self, o):
+        rnd=random.Random(o["seed"]); products=list(Product.objects.filter(active=True).values_list("pk", flat=True))
+        for i in range(o["users"]):
+            with transaction.atomic():
+                u,created=User.objects.get_or_create(username=f"loadtest-{i}")
+                if not created: continue
+                u.set_password("demo1234"); u.save()
+                board=Board.objects.create(owner=u,name="Load Board")
+                columns=Column.objects.bulk_create([Column(board=board,name=n,position=(k+1)*GAP) for k, n in enumerate(("Todo","Doing","Done"))])
+                cards=Card.objects.bulk_create([Card(column=c,title=f"card {k}",position=(k+1)*GAP) for c in columns for k in range(o["cards"])], batch_size=1000)
+                Comment.objects.bulk_create([Comment(card=c,author=u,body=f"note {k}") for c in cards for k in range(o["comments"])], batch_size=1000)
+                build_orders(u, [[{"product_id": rnd.choice(products), "quantity": rnd.randint(1,3)} for _ in range(rnd.randint(1,5))] for _ in range(o["orders"])])
+                start=date.today()-timedelta(days=o["metrics"])
+                Metric.objects.bulk_create([Metric(owner=u,date=start+timedelta(days=d),rhr_bpm=rnd.randint(45,65),weight_kg=rnd.randint(600,800)/10) for d in range(o["metrics"])], batch_size=1000)
+                refresh(u.pk, start, date.today())
+                generate_plan(u, "Load Plan", start, o["plan_weeks"])
+        self.stdout.write(self.style.SUCCESS(f"Seeded {o['users']} load-test users (loadtest-N / demo1234)"))
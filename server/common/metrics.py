@@ -0,0 +1,71 @@
+import bisect, random, threading, time
+from collections import defaultdict, deque
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils.timezone import now
+LATENCY_BUCKETS=(0.005,0.01,0.025,0.05,0.1,0.25,0.5,1.0,2.5,5.0,10.0)
+QUERY_BUCKETS=(0,1,2,5,10,20,50,100,200,500)
+class Histogram:
+    __slots__=("bounds","counts","sum")
+    def __init__(self, bounds): self.bounds=bounds; self.counts=[0]*(len(bounds)+1); self.sum=0.0
+    def observe(self, value): self.counts[bisect.bisect_left(self.bounds, value)]+=1; self.sum+=value
+    def lines(self, name, labels):
+        running=0
+        for bound, n in zip(self.bounds+("+Inf",), self.counts):
+            running+=n; yield f'{name}_bucket{{{labels},le="{bound}"}} {running}'
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {running}"
+class Route:
+    __slots__=("latency","queries","db_seconds","bytes","statuses")
+    def __init__(self):
+        self.latency=Histogram(LATENCY_BUCKETS); self.queries=Histogram(QUERY_BUCKETS); self.db_seconds=0.0; self.bytes=0; self.statuses=defaultdict(int)
+class Registry:
+    def __init__(self, slow_samples=50):
+        self.lock=threading.Lock(); self.routes=defaultdict(Route); self.slow=deque(maxlen=slow_samples)
+    def observe(self, view, method, status, seconds, queries, db_seconds, size):
+        with self.lock:
+            r=self.routes[(view, method)]
+            r.latency.observe(seconds); r.queries.observe(queries); r.db_seconds+=db_seconds; r.bytes+=size; r.statuses[status]+=1
+    def sample(self, entry):
+        with self.lock: self.slow.append(entry)
+    def slow_requests(self):
+        with self.lock: return list(self.slow)
+    def render(self):
+        with self.lock: routes={k: (r, dict(r.statuses)) for k, r in self.routes.items()}
+        out=["# HELP http_requests_total Requests by view, method and status.", "# TYPE http_requests_total counter"]
+        for (view, method), (r, statuses) in routes.items():
+            out+=[f'http_requests_total{{view="{view}",method="{method}",status="{s}"}} {n}' for s, n in sorted(statuses.items())]
+        for name, kind, help_text, value in (
+            ("http_request_duration_seconds", "histogram", "Request latency.", lambda r: r.latency),
+            ("http_request_db_queries", "histogram", "Database queries per request.", lambda r: r.queries),
+            ("http_request_db_seconds_total", "counter", "Time spent in database queries.", lambda r: r.db_seconds),
+            ("http_response_bytes_total", "counter", "Response body bytes (non-streaming).", lambda r: r.bytes)):
+            out+=[f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for (view, method), (r, _) in routes.items():
+                labels=f'view="{view}",method="{method}"'; v=value(r)
+                out+=list(v.lines(name, labels)) if isinstance(v, Histogram) else [f"{name}{{{labels}}} {v}"]
+        return "\n".join(out)+"\n"
+registry=Registry(getattr(settings, "METRICS_SLOW_SAMPLES", 50))
+class QueryCounter:
+    __slots__=("count","seconds","sql")
+    def __init__(self, capture): self.count=0; self.seconds=0.0; self.sql=[] if capture else None
+    def __call__(self, execute, sql, params, many, context):
+        start=time.perf_counter()
+        try: return execute(sql, params, many, context)
+        finally:
+            elapsed=time.perf_counter()-start; self.count+=1; self.seconds+=elapsed
+            if self.sql is not None: self.sql.append({"sql": sql, "ms": round(elapsed*1000, 3)})
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", True): raise MiddlewareNotUsed
+        self.get_response=get_response; self.sample_rate=getattr(settings, "METRICS_SAMPLE_RATE", 0.05); self.slow_s=getattr(settings, "METRICS_SLOW_MS", 500)/1000
+    def __call__(self, request):
+        counter=QueryCounter(self.sample_rate > 0 and random.random() < self.sample_rate); start=time.perf_counter()
+        with connection.execute_wrapper(counter): response=self.get_response(request)
+        elapsed=time.perf_counter()-start
+        match=getattr(request, "resolver_match", None); view=match.view_name if match else "unmatched"
+        registry.observe(view, request.method, response.status_code, elapsed, counter.count, counter.seconds, 0 if response.streaming else len(response.content))
+        if counter.sql is not None and elapsed >= self.slow_s:
+            registry.sample({"at": now(), "view": view, "method": request.method, "path": request.path, "status": response.status_code, "ms": round(elapsed*1000, 1), "queries": counter.sql})
+        return response
@@ -0,0 +1,2 @@
+from .audit import AuditLog  # noqa: F401
+from . import db  # noqa: F401
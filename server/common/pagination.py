@@ -0,0 +1,43 @@
+import json
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+class KeysetPagination(CursorPagination):
+    page_size=50; page_size_query_param="page_size"; max_page_size=500; ordering=("-id",)
+    def get_ordering(self, request, queryset, view):
+        ordering=getattr(view, "cursor_ordering", self.ordering)
+        ordering=(ordering,) if isinstance(ordering, str) else tuple(ordering)
+        if ordering[-1].lstrip("-") in ("id","pk"): return ordering
+        return ordering+("-id" if ordering[-1].startswith("-") else "id",)
+    def _get_position_from_instance(self, instance, ordering):
+        return json.dumps([str(instance[f.lstrip("-")] if isinstance(instance, dict) else getattr(instance, f.lstrip("-"))) for f in ordering])
+    def _past(self, position, reverse):
+        try: values=json.loads(position)
+        except ValueError: values=None
+        if not isinstance(values, list) or len(values)!=len(self.ordering): raise NotFound(self.invalid_cursor_message)
+        q=Q(); equal={}
+        for field, value in zip(self.ordering, values):
+            name=field.lstrip("-"); q|=Q(**equal, **{f"{name}__{'lt' if field.startswith('-')!=reverse else 'gt'}": value}); equal[name]=value
+        return q
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request=request; self.page_size=self.get_page_size(request)
+        if not self.page_size: return None
+        self.base_url=request.build_absolute_uri(); self.ordering=self.get_ordering(request, queryset, view)
+        self.cursor=self.decode_cursor(request)
+        offset, reverse, position = self.cursor or (0, False, None)
+        queryset=queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        try:
+            if position is not None: queryset=queryset.filter(self._past(position, reverse))
+            results=list(queryset[offset:offset+self.page_size+1])
+        except (ValueError, DjangoValidationError): raise NotFound(self.invalid_cursor_message)
+        self.page=results[:self.page_size]
+        following=self._get_position_from_instance(results[-1], self.ordering) if len(results) > len(self.page) else None
+        if reverse:
+            self.page=list(reversed(self.page)); self.has_next=position is not None or offset > 0; self.has_previous=following is not None
+            self.next_position=position; self.previous_position=following
+        else:
+            self.has_next=following is not None; self.has_previous=position is not None or offset > 0
+            self.next_position=following; self.previous_position=position
+        if (self.has_previous or self.has_next) and self.template is not None: self.display_page_controls=True
+        return self.page
@@ -0,0 +1,130 @@
+import base64, json, os, subprocess, sys, tempfile
+from datetime import date, timedelta
+from unittest import skipUnless
+from urllib.parse import parse_qs, urlparse
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from training.models import Plan, Workout
+from . import metrics
+from .audit import AuditLog, AuditWriter, history, record
+class AuditTests(TestCase):
+    def setUp(self):
+        self.admin=User.objects.create_user("admin", is_staff=True); self.client=APIClient(); self.client.force_authenticate(self.admin)
+        stamp=now(); self.entries=AuditLog.objects.bulk_create([AuditLog(action="move", entity="card", entity_id=7, created_at=stamp-timedelta(seconds=i//3)) for i in range(10)])
+        AuditLog.objects.create(action="move", entity="card", entity_id=8, created_at=stamp)
+    def test_history_keyset_pages(self):
+        seen=[]; cursor=None
+        while True:
+            rows, cursor = history("card", 7, cursor, limit=3); seen+=[r.pk for r in rows]
+            if not cursor: break
+        expected=list(AuditLog.objects.filter(entity_id=7).order_by("-created_at","-id").values_list("pk", flat=True))
+        self.assertEqual(seen, expected); self.assertEqual(len(seen), 10)
+    def test_history_cursor_is_stable_across_inserts(self):
+        rows, cursor = history("card", 7, limit=4)
+        record(self.admin, "move", "card", 7)
+        more, _ = history("card", 7, cursor, limit=20)
+        self.assertEqual(len(rows)+len(more), 10); self.assertFalse({r.pk for r in rows} & {r.pk for r in more})
+    def test_api_limit_validation(self):
+        url="/api/audit/?entity=card&entity_id=7"
+        for bad in ("0", "-3", "abc"):
+            r=self.client.get(f"{url}&limit={bad}"); self.assertEqual(r.status_code, 400); self.assertIn("limit", r.data)
+        self.assertEqual(self.client.get(f"{url}&cursor=nope").data, {"cursor": ["invalid cursor"]})
+        r=self.client.get(f"{url}&limit=4"); self.assertEqual(len(r.data["results"]), 4)
+        r=self.client.get(f"{url}&limit=4&cursor={r.data['next']}"); self.assertEqual(len(r.data["results"]), 4)
+        self.assertEqual(len(self.client.get(f"{url}&limit=9999").data["results"]), 10)
+    @override_settings(AUDIT_ASYNC=True)
+    def test_record_inside_atomic_is_synchronous(self):
+        record(self.admin, "pay", "order", 99)
+        self.assertTrue(AuditLog.objects.filter(entity="order", entity_id=99).exists())
+    def test_queue_full_drops(self):
+        writer=AuditWriter(maxsize=2); writer.start=lambda: None
+        with self.assertLogs("common.audit", "WARNING"): results=[writer.put(AuditLog(action="x", entity="card", entity_id=1)) for _ in range(5)]
+        self.assertEqual(results, [True, True, False, False, False]); self.assertEqual(writer.dropped, 3)
+        writer.flush(); self.assertEqual(writer.written, 2); self.assertEqual(writer.dropped, 3)
+        self.assertEqual(AuditLog.objects.filter(action="x").count(), 2)
+class KeysetPaginationTests(TestCase):
+    url="/api/training/workouts/"
+    def setUp(self):
+        self.user=User.objects.create_user("runner"); self.client=APIClient(); self.client.force_authenticate(self.user)
+        self.plans=[Plan.objects.create(owner=self.user, name=f"p{i}", start_date=date(2024,1,1)) for i in range(3)]
+        Workout.objects.bulk_create([Workout(plan=p, date=date(2024,1,1)+timedelta(days=d), kind="easy", distance_km=5) for d in range(4) for p in self.plans])
+    def pages(self, url, between=lambda: None):
+        ids=[]
+        while url:
+            r=self.client.get(url); self.assertEqual(r.status_code, 200); ids+=[w["id"] for w in r.data["results"]]; url=r.data["next"]; between()
+        return ids
+    def test_cursor_is_the_full_sort_key(self):
+        r=self.client.get(self.url, {"page_size": 4}); cursor=parse_qs(urlparse(r.data["next"]).query)["cursor"][0]
+        token=parse_qs(base64.b64decode(cursor).decode())
+        self.assertNotIn("o", token); self.assertEqual(json.loads(token["p"][0]), ["2024-01-02", str(r.data["results"][-1]["id"])])
+        expected=list(Workout.objects.order_by("date","id").values_list("id", flat=True))
+        self.assertEqual(self.pages(f"{self.url}?page_size=5"), expected)
+        prev=self.client.get(self.client.get(r.data["next"]).data["previous"]).data["results"]
+        self.assertEqual([w["id"] for w in prev], expected[:4])
+    def test_cursor_is_stable_across_inserts(self):
+        expected=list(Workout.objects.order_by("date","id").values_list("id", flat=True))
+        def insert(): Workout.objects.create(plan=self.plans[0], date=date(2024,1,1), kind="new", distance_km=1)
+        ids=self.pages(f"{self.url}?page_size=5", insert)
+        self.assertEqual(ids, expected); self.assertEqual(len(set(ids)), len(ids))
+    def test_tampered_cursor(self):
+        for payload in ("p=nope", "p=%5B%22x%22%5D", "p=%5B%22bad-date%22%2C%221%22%5D"):
+            self.assertEqual(self.client.get(self.url, {"cursor": base64.b64encode(payload.encode()).decode()}).status_code, 404, payload)
+    def test_filter_errors(self):
+        for params, field in [({"from": "2024-13-01"}, "from"), ({"to": "soon"}, "to"), ({"plan": "abc"}, "plan")]:
+            r=self.client.get(self.url, params); self.assertEqual(r.status_code, 400, params); self.assertIn(field, r.data)
+        r=self.client.get(self.url, {"from": "2024-01-02", "to": "2024-01-03", "plan": self.plans[1].pk})
+        self.assertEqual([w["date"] for w in r.data["results"]], ["2024-01-02", "2024-01-03"])
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.registry=metrics.registry; self.registry.routes.clear(); self.registry.slow.clear()
+        self.user=User.objects.create_user("admin", is_staff=True); self.client=APIClient(); self.client.force_authenticate(self.user)
+    def test_histogram_buckets(self):
+        h=metrics.Histogram((1, 5, 10))
+        for v in (0, 1, 1.5, 5, 10, 11): h.observe(v)
+        self.assertEqual(h.counts, [2, 2, 1, 1]); self.assertEqual(h.sum, 28.5)
+        self.assertEqual(list(h.lines("q", 'view="v"')), ['q_bucket{view="v",le="1"} 2', 'q_bucket{view="v",le="5"} 4', 'q_bucket{view="v",le="10"} 5', 'q_bucket{view="v",le="+Inf"} 6', 'q_sum{view="v"} 28.5', 'q_count{view="v"} 6'])
+    def test_exposition_format(self):
+        registry=metrics.Registry(); registry.observe("plan-list", "GET", 200, 0.02, 3, 0.004, 120); registry.observe("plan-list", "GET", 404, 0.3, 1, 0.001, 10)
+        text=registry.render(); lines=text.splitlines()
+        self.assertTrue(text.endswith("\n"))
+        self.assertIn('http_requests_total{view="plan-list",method="GET",status="200"} 1', lines); self.assertIn('http_requests_total{view="plan-list",method="GET",status="404"} 1', lines)
+        self.assertIn('http_request_duration_seconds_bucket{view="plan-list",method="GET",le="0.025"} 1', lines)
+        self.assertIn('http_request_duration_seconds_bucket{view="plan-list",method="GET",le="+Inf"} 2', lines)
+        self.assertIn('http_request_db_queries_bucket{view="plan-list",method="GET",le="2"} 1', lines)
+        self.assertIn('http_response_bytes_total{view="plan-list",method="GET"} 130', lines)
+        for line in lines:
+            if not line.startswith("#"): self.assertRegex(line, r'^[a-z_]+\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\} [0-9.e+-]+$')
+        self.assertEqual([l.split()[2] for l in lines if l.startswith("# TYPE")], ["http_requests_total", "http_request_duration_seconds", "http_request_db_queries", "http_request_db_seconds_total", "http_response_bytes_total"])
+    def test_query_counting(self):
+        with CaptureQueriesContext(connection) as ctx: self.assertEqual(self.client.get("/api/training/metrics/").status_code, 200)
+        route=self.registry.routes[("metric-list", "GET")]
+        self.assertEqual(route.queries.sum, len(ctx.captured_queries)); self.assertEqual(sum(route.queries.counts), 1); self.assertEqual(dict(route.statuses), {200: 1})
+        r=self.client.get("/api/metrics"); self.assertEqual(r["Content-Type"], "text/plain; version=0.0.4; charset=utf-8"); self.assertIn(b'view="metric-list"', r.content)
+    @override_settings(METRICS_SAMPLE_RATE=1, METRICS_SLOW_MS=0)
+    def test_slow_samples(self):
+        self.client.get("/api/training/metrics/")
+        slow=self.client.get("/api/metrics/slow/").data
+        self.assertEqual([s["view"] for s in slow], ["metric-list"]); self.assertTrue(slow[0]["queries"]); self.assertIn("sql", slow[0]["queries"][0])
+    def test_default_sample_rate_is_nonzero(self):
+        self.assertGreater(settings.METRICS_SAMPLE_RATE, 0)
+@skipUnless(connection.vendor=="sqlite", "SQLite only")
+class SqlitePragmaTests(SimpleTestCase):
+    def pragmas(self, conn):
+        with conn.cursor() as cursor: return {name: cursor.execute(f"PRAGMA {name}").fetchone()[0] for name in ("journal_mode", "busy_timeout", "synchronous", "temp_store")}
+    def test_pragmas_on_a_file_connection(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            conn=connections["default"].__class__({**connection.settings_dict, "NAME": os.path.join(tmp, "db.sqlite3")}, alias="pragmas")
+            try:
+                self.assertEqual(conn.get_connection_params()["timeout"], settings.SQLITE_TIMEOUT)
+                self.assertEqual(self.pragmas(conn), {"journal_mode": "wal", "busy_timeout": int(settings.SQLITE_TIMEOUT*1000), "synchronous": 1, "temp_store": 2})
+            finally: conn.close()
+    def test_timeout_feeds_driver_and_busy_timeout(self):
+        code="import django; django.setup(); from django.conf import settings as s; print(s.DATABASES['default']['OPTIONS']['timeout'], s.SQLITE_PRAGMAS['busy_timeout'])"
+        env={**os.environ, "SQLITE_TIMEOUT": "2.5", "DJANGO_DB_PROFILE": "sqlite", "SQLITE_TUNING": "1"}
+        out=subprocess.run([sys.executable, "-c", code], env=env, cwd=settings.BASE_DIR, capture_output=True, text=True, check=True).stdout.split()
+        self.assertEqual(out, ["2.5", "2500"])
@@ -1,31 +1,65 @@
+import csv
 from rest_framework import viewsets, permissions, routers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from django.urls import path, include
-from django.db.models import Sum, Avg
 from .models import Plan, Workout, Metric
-from .serializers import PlanSerializer, WorkoutSerializer, MetricSerializer
-from .services import generate_plan
+from .serializers import PlanSerializer, WorkoutSerializer, MetricSerializer, GeneratePlanSerializer
+from common.filters import date_param, date_range, exact
+from .services import generate_plan, rules_from, PATTERNS
+from .stats import summary, PERIODS
+from .transfer import FORMATS, WORKOUT_FIELDS, METRIC_FIELDS, export_response, import_rows, read_rows
+def transfer_format(request, filename=""):
+    fmt = request.query_params.get("fmt") or ("ndjson" if filename.endswith((".ndjson",".jsonl")) else "csv")
+    if fmt not in FORMATS: raise ValidationError({"fmt": [f"choose one of: {', '.join(FORMATS)}"]})
+    return fmt
+def import_upload(request, kind, plan=None):
+    upload = request.FILES.get("file")
+    if upload is None: raise ValidationError({"file": ["upload a CSV or NDJSON file"]})
+    try: result = import_rows(read_rows(upload, transfer_format(request, upload.name)), kind, request.user, plan)
+    except (csv.Error, UnicodeDecodeError) as e: raise ValidationError({"file": [str(e)]})
+    return Response(result, status=status.HTTP_201_CREATED if result["created"] else status.HTTP_200_OK)
 class PlanViewSet(viewsets.ModelViewSet):
     serializer_class = PlanSerializer; permission_classes=[permissions.IsAuthenticated]
+    trust_token_claims=True
+    cursor_ordering=("-created_at","-id")
     def get_queryset(self): return Plan.objects.filter(owner=self.request.user).prefetch_related("workouts")
     @action(detail=False, methods=["post"])
     def generate(self, request):
-        plan = generate_plan(request.user, request.data.get("name","Training Plan"), request.data.get("start_date"), int(request.data.get("weeks",12)))
+        params = GeneratePlanSerializer(data=request.data); params.is_valid(raise_exception=True); data = params.validated_data
+        plan = generate_plan(request.user, data["name"], data["start_date"], data["weeks"], pattern=PATTERNS[data["pattern"]], rules=rules_from(data))
         return Response(PlanSerializer(plan).data, status=status.HTTP_201_CREATED)
 class WorkoutViewSet(viewsets.ModelViewSet):
     serializer_class = WorkoutSerializer; permission_classes=[permissions.IsAuthenticated]
-    def get_queryset(self): return Workout.objects.filter(plan__owner=self.request.user)
+    trust_token_claims=True
+    cursor_ordering=("date","id")
+    def get_queryset(self): return exact(date_range(Workout.objects.filter(plan__owner=self.request.user), self.request.query_params), self.request.query_params, plan="plan_id", kind="kind")
+    @action(detail=False, methods=["get"])
+    def export(self, request): return export_response(self.get_queryset().order_by("date","id"), WORKOUT_FIELDS, transfer_format(request), "workouts")
+    @action(detail=False, methods=["post"], url_path="import")
+    def import_file(self, request):
+        plan_id = str(request.data.get("plan", ""))
+        plan = Plan.objects.filter(owner=request.user, pk=plan_id).first() if plan_id.isdigit() else None
+        if plan is None: raise ValidationError({"plan": ["a plan you own is required"]})
+        return import_upload(request, "workouts", plan)
 class MetricViewSet(viewsets.ModelViewSet):
     serializer_class = MetricSerializer; permission_classes=[permissions.IsAuthenticated]
-    def get_queryset(self): return Metric.objects.filter(owner=self.request.user)
+    trust_token_claims=True
+    cursor_ordering=("-date","-id")
+    def get_queryset(self): return date_range(Metric.objects.filter(owner=self.request.user), self.request.query_params)
     def perform_create(self, serializer): serializer.save(owner=self.request.user)
+    @action(detail=False, methods=["get"])
+    def export(self, request): return export_response(self.get_queryset().order_by("date","id"), METRIC_FIELDS, transfer_format(request), "metrics")
+    @action(detail=False, methods=["post"], url_path="import")
+    def import_file(self, request): return import_upload(request, "metrics")
 class StatsViewSet(viewsets.ViewSet):
     permission_classes=[permissions.IsAuthenticated]
+    trust_token_claims=True
     def list(self, request):
-        total_km = Workout.objects.filter(plan__owner=request.user).aggregate(Sum("distance_km"))["distance_km__sum"] or 0
-        avg_rhr = Metric.objects.filter(owner=request.user).aggregate(Avg("rhr_bpm"))["rhr_bpm__avg"]
-        return Response({"total_km": total_km, "avg_rhr": avg_rhr})
+        period = request.query_params.get("period")
+        if period and period not in PERIODS: raise ValidationError({"period": [f"choose one of: {', '.join(PERIODS)}"]})
+        return Response(summary(request.user, period, date_param(request.query_params, "from"), date_param(request.query_params, "to")))
 router=routers.DefaultRouter()
 router.register(r"plans", PlanViewSet, basename="plan")
 router.register(r"workouts", WorkoutViewSet, basename="workout")
@@ -0,0 +1,36 @@
+import time
+from datetime import date
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from ...models import Plan, Workout
+from ...services import generate_plan, build_workouts, ramp, taper
+class Command(BaseCommand):
+    help = "Benchmark plan generation (batched vs per-row inserts). All writes are rolled back."
+    def add_arguments(self, parser):
+        parser.add_argument("--weeks", type=int, nargs="+", default=[12,52,104])
+        parser.add_argument("--repeat", type=int, default=3)
+    def per_row(self, owner, weeks):
+        plan=Plan.objects.create(owner=owner,name="bench",start_date=date(2025,1,6),weeks=weeks)
+        for w in build_workouts(plan): w.save()
+    def batched(self, owner, weeks):
+        generate_plan(owner, "bench", date(2025,1,6), weeks, rules=[ramp(0.05, cap=1.5), taper(2)])
+    def run(self, fn, owner, weeks, repeat):
+        best=None; queries=0
+        for _ in range(repeat):
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as ctx:
+                    t=time.perf_counter(); fn(owner, weeks); dt=time.perf_counter()-t
+                queries=len(ctx.captured_queries); transaction.set_rollback(True)
+            best=dt if best is None else min(best, dt)
+        return best, queries
+    def handle(self, *args, **opts):
+        with transaction.atomic():
+            owner,_=User.objects.get_or_create(username="bench-generate")
+            self.stdout.write(f"{'weeks':>6} {'workouts':>9} {'per-row ms':>11} {'queries':>8} {'batched ms':>11} {'queries':>8}")
+            for weeks in opts["weeks"]:
+                slow=self.run(self.per_row, owner, weeks, opts["repeat"]); fast=self.run(self.batched, owner, weeks, opts["repeat"])
+                self.stdout.write(f"{weeks:>6} {weeks*6:>9} {slow[0]*1000:>11.1f} {slow[1]:>8} {fast[0]*1000:>11.1f} {fast[1]:>8}")
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS(f"best of {opts['repeat']} runs; {Workout.objects.count()} workouts left in db (unchanged)"))
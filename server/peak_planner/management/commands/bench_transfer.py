@@ -0,0 +1,33 @@
+import io, time, tracemalloc
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import transaction
+from ...models import Metric
+from ...transfer import FORMATS, METRIC_FIELDS, export_lines, import_rows, read_rows
+class Command(BaseCommand):
+    help = "Measure streaming export/import throughput (rows/sec) for metrics. All writes are rolled back."
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100000)
+        parser.add_argument("--batch-size", type=int, default=1000)
+    def handle(self, *args, **o):
+        n=o["rows"]
+        with transaction.atomic():
+            user,_=User.objects.get_or_create(username="bench-transfer")
+            Metric.objects.filter(owner=user).delete()
+            Metric.objects.bulk_create([Metric(owner=user,date=date(1900,1,1)+timedelta(days=i),weight_kg=70+i%10,rhr_bpm=50+i%15) for i in range(n)], batch_size=1000)
+            qs=Metric.objects.filter(owner=user).order_by("date","id")
+            self.stdout.write(f"{'format':>7} {'export rows/s':>14} {'peak MiB':>9} {'import rows/s':>14} {'update rows/s':>14}")
+            for fmt in FORMATS:
+                tracemalloc.start(); t=time.perf_counter()
+                for chunk in export_lines(qs, METRIC_FIELDS, fmt): chunk.encode()
+                export_s=time.perf_counter()-t; peak=tracemalloc.get_traced_memory()[1]/2**20; tracemalloc.stop()
+                buf=io.BytesIO(b"".join(chunk.encode() for chunk in export_lines(qs, METRIC_FIELDS, fmt)))
+                Metric.objects.filter(owner=user).delete()
+                rates=[]
+                for _ in range(2):
+                    buf.seek(0); t=time.perf_counter()
+                    import_rows(read_rows(buf, fmt), "metrics", user, batch_size=o["batch_size"])
+                    rates.append(n/(time.perf_counter()-t))
+                self.stdout.write(f"{fmt:>7} {n/export_s:>14,.0f} {peak:>9.1f} {rates[0]:>14,.0f} {rates[1]:>14,.0f}")
+            transaction.set_rollback(True)
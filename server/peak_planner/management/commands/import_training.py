@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from ...models import Plan
+from ...transfer import KINDS, FORMATS, import_rows, read_rows
+class Command(BaseCommand):
+    help = "Stream-import workouts or metrics from a CSV/NDJSON file, upserting by date."
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--user", required=True)
+        parser.add_argument("--kind", choices=list(KINDS), required=True)
+        parser.add_argument("--plan", type=int, help="target plan id (workouts only)")
+        parser.add_argument("--fmt", choices=list(FORMATS))
+        parser.add_argument("--batch-size", type=int, default=1000)
+    def handle(self, *args, **o):
+        user=User.objects.filter(username=o["user"]).first()
+        if user is None: raise CommandError(f"no such user: {o['user']}")
+        plan=None
+        if o["kind"]=="workouts":
+            plan=Plan.objects.filter(owner=user, pk=o["plan"]).first() if o["plan"] else None
+            if plan is None: raise CommandError("--plan must name one of the user's plans")
+        fmt=o["fmt"] or ("ndjson" if o["path"].endswith((".ndjson",".jsonl")) else "csv")
+        t=time.perf_counter()
+        with open(o["path"], "rb") as f: result=import_rows(read_rows(f, fmt), o["kind"], user, plan, o["batch_size"])
+        dt=time.perf_counter()-t
+        for e in result["errors"]: self.stderr.write(f"row {e['row']}: {e['error']}")
+        self.stdout.write(self.style.SUCCESS(f"{result['rows']} rows: {result['created']} created, {result['updated']} updated, {len(result['errors'])} errors shown ({result['rows']/dt if dt else 0:,.0f} rows/s)"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db.models import Avg, Count, Sum
+from ...models import Workout, Metric
+from ...stats import rebuild, summary
+class Command(BaseCommand):
+    help = "Rebuild weekly training summaries from raw workouts/metrics, or --check them against raw aggregates."
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="limit to one username")
+        parser.add_argument("--check", action="store_true")
+    def handle(self, *args, **opts):
+        users=User.objects.all()
+        if opts["user"]:
+            users=users.filter(username=opts["user"])
+            if not users.exists(): raise CommandError(f"no such user: {opts['user']}")
+        if opts["check"]: return self.check_users(users)
+        for user in users.iterator(): rebuild(user.pk)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt weekly summaries for {users.count()} users"))
+    def check_users(self, users):
+        bad=0
+        for user in users.iterator():
+            raw=Workout.objects.filter(plan__owner=user).aggregate(km=Sum("distance_km"), workouts=Count("id"), duration=Sum("duration_min"))
+            rhr=Metric.objects.filter(owner=user).aggregate(a=Avg("rhr_bpm"))["a"]
+            s=summary(user, "week"); periods=s["periods"]
+            have=(s["total_km"], sum(p["workouts"] for p in periods), sum(p["duration_min"] for p in periods), s["avg_rhr"])
+            want=(raw["km"] or 0, raw["workouts"], raw["duration"] or 0, round(rhr, 2) if rhr is not None else None)
+            if have!=want:
+                bad+=1; self.stdout.write(f"{user.username}: summaries={have} raw={want}")
+        if bad: raise CommandError(f"{bad} users have stale summaries; run rebuild_stats to fix")
+        self.stdout.write(self.style.SUCCESS("Weekly summaries match raw aggregates"))
@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models import Max, Min
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.utils.timezone import now
 User = get_user_model()
@@ -16,8 +19,46 @@ class Workout(models.Model):
     distance_km = models.DecimalField(max_digits=5, decimal_places=2, default=0)
     duration_min = models.PositiveIntegerField(default=0)
     notes = models.TextField(blank=True)
+    class Meta: indexes = [models.Index(fields=["plan","date"]), models.Index(fields=["plan","kind","date"])]
 class Metric(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     date = models.DateField()
     weight_kg = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     rhr_bpm = models.PositiveIntegerField(null=True, blank=True)
+    class Meta: indexes = [models.Index(fields=["owner","date"])]
+class WeeklySummary(models.Model):
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    week = models.DateField()
+    km = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+    duration_min = models.PositiveIntegerField(default=0)
+    workouts = models.PositiveIntegerField(default=0)
+    by_kind = models.JSONField(default=dict, blank=True)
+    rhr_sum = models.PositiveIntegerField(default=0)
+    rhr_count = models.PositiveIntegerField(default=0)
+    weight_sum = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+    weight_count = models.PositiveIntegerField(default=0)
+    class Meta: constraints = [models.UniqueConstraint(fields=["owner","week"], name="weekly_summary_owner_week")]
+def plan_owner(plan_id): return Plan.objects.values_list("owner_id", flat=True).get(pk=plan_id)
+def _owner_date(instance):
+    if not isinstance(instance, Workout): return instance.owner_id, instance.date
+    return (instance.plan.owner_id if Workout.plan.is_cached(instance) else plan_owner(instance.plan_id)), instance.date
+@receiver(pre_save, sender=Workout)
+@receiver(pre_save, sender=Metric)
+def remember_stats_week(sender, instance, **kwargs):
+    if not instance.pk: instance._stats_prev = None; return
+    lookup = "plan__owner_id" if sender is Workout else "owner_id"
+    instance._stats_prev = sender.objects.filter(pk=instance.pk).values_list(lookup, "date").first()
+@receiver([post_save, post_delete], sender=Workout)
+@receiver([post_save, post_delete], sender=Metric)
+def refresh_stats_week(sender, instance, origin=None, **kwargs):
+    from .stats import schedule
+    if isinstance(origin, (Plan, User)): return
+    owner_id, day = _owner_date(instance); schedule(owner_id, day)
+    prev = getattr(instance, "_stats_prev", None)
+    if prev: schedule(*prev)
+@receiver(pre_delete, sender=Plan)
+def refresh_plan_stats(sender, instance, origin=None, **kwargs):
+    from .stats import schedule
+    if isinstance(origin, User): return
+    span = instance.workouts.aggregate(lo=Min("date"), hi=Max("date"))
+    if span["lo"]: schedule(instance.owner_id, span["lo"], span["hi"])
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Plan, Workout, Metric
+from .services import PATTERNS, MAX_WEEKS
 class WorkoutSerializer(serializers.ModelSerializer):
     class Meta: model = Workout; fields = ["id","plan","date","kind","distance_km","duration_min","notes"]
 class PlanSerializer(serializers.ModelSerializer):
@@ -7,3 +8,15 @@ class PlanSerializer(serializers.ModelSerializer):
     class Meta: model = Plan; fields = ["id","name","start_date","weeks","target_race","created_at","workouts"]
 class MetricSerializer(serializers.ModelSerializer):
     class Meta: model = Metric; fields = ["id","date","weight_kg","rhr_bpm"]
+class GeneratePlanSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=120, default="Training Plan")
+    start_date = serializers.DateField()
+    weeks = serializers.IntegerField(min_value=1, max_value=MAX_WEEKS, default=12)
+    pattern = serializers.ChoiceField(choices=list(PATTERNS), default="default")
+    ramp_pct = serializers.FloatField(min_value=0, max_value=1, required=False)
+    ramp_cap = serializers.FloatField(min_value=1, required=False)
+    cutback_every = serializers.IntegerField(min_value=2, required=False)
+    taper_weeks = serializers.IntegerField(min_value=1, required=False)
+    def validate(self, attrs):
+        if attrs.get("taper_weeks", 0) >= attrs["weeks"]: raise serializers.ValidationError({"taper_weeks": ["must be less than weeks"]})
+        return attrs
@@ -1,14 +1,57 @@
 from datetime import timedelta, datetime
+from decimal import Decimal
+from django.db import transaction
 from .models import Plan, Workout
+from .stats import schedule
 DIST_TEMPLATE={"easy":5.0,"tempo":8.0,"long":16.0,"strength":0.0}
 WEEK_PATTERN=["easy","tempo","easy","strength","easy","long","rest"]
-def generate_plan(owner, name, start_date, weeks=12):
-    if isinstance(start_date,str): start_date=datetime.fromisoformat(start_date).date()
-    plan=Plan.objects.create(owner=owner,name=name,start_date=start_date,weeks=weeks)
-    d=start_date
-    for _ in range(weeks):
-        for kind in WEEK_PATTERN:
-            if kind=="rest": d += timedelta(days=1); continue
-            Workout.objects.create(plan=plan,date=d,kind=kind,distance_km=DIST_TEMPLATE.get(kind,5.0),duration_min=int(DIST_TEMPLATE.get(kind,5.0)*6))
+PATTERNS={
+    "default": WEEK_PATTERN,
+    "three_day": ["easy","rest","tempo","rest","rest","long","rest"],
+    "five_day": ["easy","tempo","rest","easy","rest","long","easy"],
+    "strength": ["easy","strength","tempo","strength","rest","long","rest"],
+}
+MIN_PER_KM=6
+MAX_WEEKS=104
+_KM=Workout._meta.get_field("distance_km")
+MAX_KM=Decimal(10)**(_KM.max_digits-_KM.decimal_places)-Decimal(10)**-_KM.decimal_places
+def ramp(pct=0.1, every=1, cap=None):
+    def rule(week, weeks):
+        f = (1 + pct) ** (week // every)
+        return min(f, cap) if cap else f
+    return rule
+def cutback(every=4, factor=0.7):
+    def rule(week, weeks): return factor if (week + 1) % every == 0 else 1.0
+    return rule
+def taper(last=2, factor=0.6):
+    def rule(week, weeks):
+        left = weeks - week
+        return factor ** (last - left + 1) if left <= last else 1.0
+    return rule
+def week_factor(week, weeks, rules=()):
+    f = 1.0
+    for rule in rules: f *= rule(week, weeks)
+    return f
+def build_workouts(plan, pattern=WEEK_PATTERN, template=DIST_TEMPLATE, rules=()):
+    d=plan.start_date; out=[]
+    for week in range(plan.weeks):
+        f = week_factor(week, plan.weeks, rules)
+        for kind in pattern:
+            if kind!="rest":
+                km = min(Decimal(str(template.get(kind,5.0) * f)), MAX_KM).quantize(Decimal("0.01"))
+                out.append(Workout(plan=plan,date=d,kind=kind,distance_km=km,duration_min=int(km*MIN_PER_KM)))
             d += timedelta(days=1)
+    return out
+def rules_from(data):
+    rules=[]
+    if data.get("ramp_pct"): rules.append(ramp(float(data["ramp_pct"]), cap=float(data.get("ramp_cap") or 0) or None))
+    if data.get("cutback_every"): rules.append(cutback(int(data["cutback_every"])))
+    if data.get("taper_weeks"): rules.append(taper(int(data["taper_weeks"])))
+    return rules
+def generate_plan(owner, name, start_date, weeks=12, pattern=WEEK_PATTERN, template=DIST_TEMPLATE, rules=()):
+    if isinstance(start_date,str): start_date=datetime.fromisoformat(start_date).date()
+    with transaction.atomic():
+        plan=Plan.objects.create(owner=owner,name=name,start_date=start_date,weeks=weeks)
+        workouts=Workout.objects.bulk_create(build_workouts(plan, pattern, template, rules), batch_size=500)
+        if workouts: schedule(owner.pk, workouts[0].date, workouts[-1].date)
     return plan
@@ -0,0 +1,74 @@
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from .models import Workout, Metric, WeeklySummary
+PERIODS=("week","month")
+_pending=threading.local()
+DAY=timedelta(days=1)
+def week_of(d): return d - timedelta(days=d.weekday())
+def segment_of(d): return max(week_of(d), d.replace(day=1))
+def segment_end(d):
+    month_end=(d.replace(day=28)+timedelta(days=4)).replace(day=1)-DAY
+    return min(week_of(d)+timedelta(days=6), month_end)
+def compute(owner_id, start=None, end=None):
+    rows={}
+    def row(r):
+        key=max(r["w"], r["m"]); return rows.setdefault(key, WeeklySummary(owner_id=owner_id, week=key, km=Decimal(0), weight_sum=Decimal(0), by_kind={}))
+    window={"date__range": (start, end)} if start else {}
+    workouts=Workout.objects.filter(plan__owner_id=owner_id, **window).annotate(w=TruncWeek("date"), m=TruncMonth("date")).values("w","m","kind").annotate(n=Count("id"), km=Sum("distance_km"), dur=Sum("duration_min")).order_by()
+    for r in workouts:
+        s=row(r); s.workouts+=r["n"]; s.km+=r["km"] or 0; s.duration_min+=r["dur"] or 0; s.by_kind[r["kind"]]=s.by_kind.get(r["kind"],0)+r["n"]
+    metrics=Metric.objects.filter(owner_id=owner_id, **window).annotate(w=TruncWeek("date"), m=TruncMonth("date")).values("w","m").annotate(rhr_sum=Sum("rhr_bpm"), rhr_count=Count("rhr_bpm"), weight_sum=Sum("weight_kg"), weight_count=Count("weight_kg")).order_by()
+    for r in metrics:
+        s=row(r); s.rhr_sum=r["rhr_sum"] or 0; s.rhr_count=r["rhr_count"]; s.weight_sum=r["weight_sum"] or 0; s.weight_count=r["weight_count"]
+    return rows
+def _lock(owner_id): list(get_user_model().objects.select_for_update().filter(pk=owner_id).values_list("pk", flat=True))
+def refresh(owner_id, start, end):
+    start, end = week_of(start), week_of(end)+timedelta(days=6)
+    with transaction.atomic():
+        _lock(owner_id); rows=compute(owner_id, start, end)
+        WeeklySummary.objects.filter(owner_id=owner_id, week__range=(start, end)).delete()
+        WeeklySummary.objects.bulk_create(rows.values())
+def rebuild(owner_id):
+    with transaction.atomic():
+        _lock(owner_id); WeeklySummary.objects.filter(owner_id=owner_id).delete()
+        WeeklySummary.objects.bulk_create(compute(owner_id).values(), batch_size=1000)
+def _flush():
+    for owner_id, (lo, hi) in _pending.__dict__.pop("weeks", {}).items(): refresh(owner_id, lo, hi)
+def schedule(owner_id, *days):
+    pending=_pending.__dict__.setdefault("weeks", {})
+    lo, hi = pending.get(owner_id, (min(days), max(days)))
+    pending[owner_id]=(min(lo, *days), max(hi, *days))
+    transaction.on_commit(_flush)
+def _merge(bucket, s):
+    bucket["km"]+=s.km; bucket["duration_min"]+=s.duration_min; bucket["workouts"]+=s.workouts
+    for kind, n in s.by_kind.items(): bucket["by_kind"][kind]=bucket["by_kind"].get(kind,0)+n
+    for f in ("rhr_sum","rhr_count","weight_sum","weight_count"): bucket[f]+=getattr(s, f)
+def _avg(total, count): return round(float(total)/count, 2) if count else None
+def _rows(owner, start, end):
+    lo=start if start is None or segment_of(start)==start else segment_end(start)+DAY
+    hi=end if end is None or segment_end(end)==end else segment_of(end)-DAY
+    if lo and hi and lo > hi: return list(compute(owner.pk, start, end).values())
+    qs=WeeklySummary.objects.filter(owner=owner)
+    if lo: qs=qs.filter(week__gte=lo)
+    if hi: qs=qs.filter(week__lte=hi)
+    rows=list(qs)
+    if lo!=start: rows+=compute(owner.pk, start, lo-DAY).values()
+    if hi!=end: rows+=compute(owner.pk, hi+DAY, end).values()
+    return sorted(rows, key=lambda s: s.week)
+def summary(owner, period=None, start=None, end=None):
+    total=dict(km=Decimal(0), duration_min=0, workouts=0, by_kind={}, rhr_sum=0, rhr_count=0, weight_sum=Decimal(0), weight_count=0); buckets={}
+    for s in _rows(owner, start, end):
+        _merge(total, s)
+        if period:
+            key=week_of(s.week) if period=="week" else s.week.replace(day=1)
+            _merge(buckets.setdefault(key, dict(start=key, km=Decimal(0), duration_min=0, workouts=0, by_kind={}, rhr_sum=0, rhr_count=0, weight_sum=Decimal(0), weight_count=0)), s)
+    out={"total_km": total["km"], "avg_rhr": _avg(total["rhr_sum"], total["rhr_count"])}
+    if period:
+        out["period"]=period
+        out["periods"]=[{"start": b["start"], "km": b["km"], "duration_min": b["duration_min"], "workouts": b["workouts"], "by_kind": b["by_kind"], "avg_rhr": _avg(b["rhr_sum"], b["rhr_count"]), "avg_weight_kg": _avg(b["weight_sum"], b["weight_count"])} for b in buckets.values()]
+    return out
@@ -0,0 +1,128 @@
+import io
+from datetime import date, timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Avg, Count, Sum
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from .models import Plan, Workout, Metric, WeeklySummary
+from .services import MAX_KM, build_workouts, cutback, generate_plan, ramp, taper, week_factor
+from .stats import summary, rebuild
+from .transfer import import_rows, read_rows
+class StatsConsistencyTests(TestCase):
+    def setUp(self):
+        self.user=User.objects.create_user("runner")
+        self.plan=Plan.objects.create(owner=self.user, name="base", start_date=date(2024,4,22), weeks=4)
+    def commit(self):
+        return self.captureOnCommitCallbacks(execute=True)
+    def raw(self, start=None, end=None):
+        window={"date__range": (start, end)} if start else {}
+        w=Workout.objects.filter(plan__owner=self.user, **window).aggregate(km=Sum("distance_km"), n=Count("id"), dur=Sum("duration_min"))
+        rhr=Metric.objects.filter(owner=self.user, **window).aggregate(a=Avg("rhr_bpm"))["a"]
+        return (w["km"] or Decimal(0), w["n"], w["dur"] or 0, round(rhr, 2) if rhr is not None else None)
+    def summarized(self, start=None, end=None):
+        s=summary(self.user, "week", start, end); periods=s["periods"]
+        return (s["total_km"], sum(p["workouts"] for p in periods), sum(p["duration_min"] for p in periods), s["avg_rhr"])
+    def assertConsistent(self, start=None, end=None):
+        self.assertEqual(self.summarized(start, end), self.raw(start, end))
+        stored=list(WeeklySummary.objects.filter(owner=self.user).order_by("week").values_list("week","km","workouts"))
+        rebuild(self.user.pk)
+        self.assertEqual(stored, list(WeeklySummary.objects.filter(owner=self.user).order_by("week").values_list("week","km","workouts")))
+    def add(self, day, km="5.00", kind="easy"):
+        with self.commit(): return Workout.objects.create(plan=self.plan, date=day, kind=kind, distance_km=Decimal(km), duration_min=30)
+    def test_save_and_update(self):
+        w=self.add(date(2024,4,23))
+        with self.commit(): Metric.objects.create(owner=self.user, date=date(2024,4,24), rhr_bpm=52, weight_kg=Decimal("70.20"))
+        self.assertConsistent()
+        with self.commit(): w.distance_km=Decimal("12.50"); w.save()
+        self.assertConsistent()
+    def test_delete(self):
+        w=self.add(date(2024,4,23)); self.add(date(2024,4,25))
+        with self.commit(): w.delete()
+        self.assertConsistent()
+    def test_move_to_another_week(self):
+        w=self.add(date(2024,4,23), "8.00")
+        with self.commit(): w.date=date(2024,5,14); w.save()
+        self.assertConsistent()
+        self.assertEqual(summary(self.user, "week", date(2024,4,22), date(2024,4,28))["total_km"], 0)
+    def test_generate_plan(self):
+        with self.commit(): generate_plan(self.user, "build", date(2024,3,4), weeks=10, rules=[ramp(0.1, cap=1.5)])
+        self.assertConsistent()
+        self.assertConsistent(date(2024,3,13), date(2024,4,9))
+    def test_import(self):
+        data=io.BytesIO(b"date,kind,distance_km,duration_min\n2024-04-29,easy,6,36\n2024-04-30,tempo,8,48\n2024-05-01,long,16,96\n")
+        with self.commit(): result=import_rows(read_rows(data, "csv"), "workouts", self.user, self.plan)
+        self.assertEqual(result["created"], 3)
+        self.assertConsistent()
+    def test_month_boundary_is_exact(self):
+        self.add(date(2024,4,30), "7.00"); self.add(date(2024,5,1), "10.00")
+        months={p["start"]: p["km"] for p in summary(self.user, "month")["periods"]}
+        self.assertEqual(months, {date(2024,4,1): Decimal("7.00"), date(2024,5,1): Decimal("10.00")})
+        self.assertEqual(summary(self.user, None, date(2024,4,1), date(2024,4,30))["total_km"], Decimal("7.00"))
+        self.assertEqual([p["km"] for p in summary(self.user, "week")["periods"]], [Decimal("17.00")])
+    def test_partial_range(self):
+        for offset in range(14): self.add(date(2024,4,22)+timedelta(days=offset), "3.00")
+        for start, end in [(date(2024,4,24), date(2024,5,2)), (date(2024,4,24), date(2024,4,25)), (date(2024,4,29), date(2024,5,5))]:
+            self.assertEqual(self.summarized(start, end), self.raw(start, end))
+    def test_plan_delete_is_one_ranged_refresh(self):
+        reads=[]
+        for weeks in (4, 52):
+            with self.commit(): plan=generate_plan(self.user, f"{weeks}w", date(2024,1,1), weeks=weeks)
+            with self.commit(), CaptureQueriesContext(connection) as ctx: plan.delete()
+            reads.append(sum(not q["sql"].startswith("DELETE") for q in ctx.captured_queries)); self.assertConsistent()
+        self.assertEqual(reads, [2, 2])
+    def test_user_delete_drops_summaries(self):
+        self.add(date(2024,4,23))
+        with self.commit(): self.user.delete()
+        self.assertFalse(WeeklySummary.objects.exists())
+class PlanGenerationTests(TestCase):
+    url="/api/training/plans/generate/"
+    def setUp(self):
+        self.user=User.objects.create_user("coach"); self.client=APIClient(); self.client.force_authenticate(self.user)
+    def test_rules(self):
+        self.assertAlmostEqual(week_factor(3, 12, [ramp(0.1)]), 1.331)
+        self.assertEqual(week_factor(10, 12, [ramp(0.1, cap=1.5)]), 1.5)
+        self.assertEqual([cutback(4)(w, 12) for w in range(4)], [1.0, 1.0, 1.0, 0.7])
+        self.assertEqual([round(taper(2)(w, 12), 2) for w in (9, 10, 11)], [1.0, 0.6, 0.36])
+    def test_distance_is_clamped(self):
+        plan=Plan(owner=self.user, name="huge", start_date=date(2024,1,1), weeks=104)
+        self.assertEqual(max(w.distance_km for w in build_workouts(plan, rules=[ramp(0.1)])), MAX_KM)
+    def test_generate(self):
+        r=self.client.post(self.url, {"start_date": "2024-01-01", "weeks": 8, "pattern": "three_day", "ramp_pct": 0.1, "taper_weeks": 2}, format="json")
+        self.assertEqual(r.status_code, 201); self.assertEqual(len(r.data["workouts"]), 8*3)
+        r=self.client.post(self.url, {"start_date": "2024-01-01", "weeks": 104, "ramp_pct": 0.1}, format="json")
+        self.assertEqual(r.status_code, 201); self.assertEqual(self.client.get("/api/training/workouts/").status_code, 200)
+    def test_invalid_parameters(self):
+        for body, field in [({"weeks": 4}, "start_date"), ({"start_date": "2024-02-30"}, "start_date"), ({"start_date": "2024-01-01", "ramp_pct": "abc"}, "ramp_pct"),
+                            ({"start_date": "2024-01-01", "pattern": "x"}, "pattern"), ({"start_date": "2024-01-01", "weeks": 500}, "weeks"),
+                            ({"start_date": "2024-01-01", "weeks": 12, "taper_weeks": 50}, "taper_weeks"), ({"start_date": "2024-01-01", "cutback_every": 1}, "cutback_every")]:
+            r=self.client.post(self.url, body, format="json"); self.assertEqual(r.status_code, 400, body); self.assertIn(field, r.data)
+        self.assertFalse(Plan.objects.exists())
+class TransferTests(TestCase):
+    def setUp(self):
+        self.user=User.objects.create_user("runner"); self.client=APIClient(); self.client.force_authenticate(self.user)
+    def upload(self, body, name="metrics.csv"):
+        f=io.BytesIO(body); f.name=name
+        return self.client.post("/api/training/metrics/import/", {"file": f}, format="multipart")
+    def test_round_trip(self):
+        Metric.objects.bulk_create([Metric(owner=self.user, date=date(2024,1,1)+timedelta(days=i), rhr_bpm=50+i%5, weight_kg=Decimal("70.10") if i%2 else None) for i in range(30)])
+        expected=list(Metric.objects.filter(owner=self.user).order_by("date").values_list("date","weight_kg","rhr_bpm"))
+        for fmt in ("csv", "ndjson"):
+            body=b"".join(self.client.get(f"/api/training/metrics/export/?fmt={fmt}").streaming_content)
+            Metric.objects.filter(owner=self.user).delete()
+            r=self.upload(body, f"metrics.{fmt}"); self.assertEqual((r.status_code, r.data["created"], r.data["errors"]), (201, 30, []))
+            self.assertEqual(list(Metric.objects.filter(owner=self.user).order_by("date").values_list("date","weight_kg","rhr_bpm")), expected)
+        self.assertEqual(self.upload(body, "metrics.ndjson").data["updated"], 30)
+    def test_row_errors(self):
+        r=self.upload(b"date,weight_kg,rhr_bpm\n2024-01-01,70,50\n2024-02-30,70,50\n2024-01-02,abc,50\n2024-01-03,70,-1\n2024-01-04,12345,50\n2024-01-05,,\n")
+        self.assertEqual(r.status_code, 201); self.assertEqual((r.data["rows"], r.data["created"]), (6, 2))
+        self.assertEqual([e["row"] for e in r.data["errors"]], [2, 3, 4, 5])
+        self.assertIn("weight_kg", r.data["errors"][3]["error"])
+    def test_bad_encoding_mid_stream_commits_nothing(self):
+        body=b"date,weight_kg,rhr_bpm\n"+b"".join(f"{date(2020,1,1)+timedelta(days=i)},70,50\n".encode() for i in range(1500))+b"\xff\xfe,70,50\n"
+        r=self.upload(body); self.assertEqual(r.status_code, 400); self.assertIn("file", r.data)
+        self.assertFalse(Metric.objects.exists()); self.assertFalse(WeeklySummary.objects.exists())
+        with self.assertRaises(UnicodeDecodeError): import_rows(read_rows(io.BytesIO(body), "csv"), "metrics", self.user, batch_size=10)
+        self.assertFalse(Metric.objects.exists())
@@ -0,0 +1,97 @@
+import csv, io, json
+from functools import lru_cache
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from rest_framework import serializers
+from .models import Workout, Metric
+from .serializers import WorkoutSerializer, MetricSerializer
+from .stats import refresh
+FORMATS={"csv": "text/csv", "ndjson": "application/x-ndjson"}
+WORKOUT_FIELDS=("id","plan","date","kind","distance_km","duration_min","notes")
+METRIC_FIELDS=("id","date","weight_kg","rhr_bpm")
+CHUNK_SIZE=2000
+MAX_ERRORS=100
+class _Echo:
+    def write(self, value): return value
+def _buffered(lines, size=500):
+    buf=[]
+    for line in lines:
+        buf.append(line)
+        if len(buf) >= size: yield "".join(buf); buf=[]
+    if buf: yield "".join(buf)
+def _csv_lines(rows, fields):
+    writer=csv.writer(_Echo()); yield writer.writerow(fields)
+    for row in rows: yield writer.writerow(row)
+def _ndjson_lines(rows, fields):
+    for row in rows: yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder) + "\n"
+def export_lines(qs, fields, fmt):
+    rows=qs.values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+    return _buffered(_csv_lines(rows, fields) if fmt=="csv" else _ndjson_lines(rows, fields))
+def export_response(qs, fields, fmt, filename):
+    response=StreamingHttpResponse(export_lines(qs, fields, fmt), content_type=FORMATS[fmt])
+    response["Content-Disposition"]=f'attachment; filename="{filename}.{fmt}"'
+    return response
+def read_rows(f, fmt):
+    text=io.TextIOWrapper(getattr(f, "file", f), encoding="utf-8-sig", newline="")
+    if fmt=="csv": yield from csv.DictReader(text); return
+    for line in text:
+        if line.strip(): yield line
+def _blank(v): return v is None or v==""
+def _date(v):
+    d=v if isinstance(v, date) else parse_date(str(v or ""))
+    if d is None: raise ValueError(f"invalid date {v!r}")
+    return d
+def _decimal(v, default=None):
+    if _blank(v): return default
+    try: return Decimal(str(v)).quantize(Decimal("0.01"))
+    except InvalidOperation: raise ValueError(f"invalid number {v!r}")
+def _int(v, default=None):
+    if _blank(v): return default
+    n=int(v)
+    if n < 0: raise ValueError(f"negative value {v!r}")
+    return n
+@lru_cache(maxsize=None)
+def _fields(serializer): return serializer().fields
+def _validated(serializer, row):
+    fields=_fields(serializer)
+    for name, v in row.items():
+        if v is None: continue
+        try: fields[name].run_validation(v)
+        except serializers.ValidationError as e: raise ValueError(f"{name}: {' '.join(map(str, e.detail))}")
+    return row
+def parse_workout(r):
+    if _blank(r.get("kind")): raise ValueError("kind is required")
+    return _validated(WorkoutSerializer, {"date": _date(r.get("date")), "kind": str(r["kind"])[:40], "distance_km": _decimal(r.get("distance_km"), Decimal(0)), "duration_min": _int(r.get("duration_min"), 0), "notes": r.get("notes") or ""})
+def parse_metric(r):
+    return _validated(MetricSerializer, {"date": _date(r.get("date")), "weight_kg": _decimal(r.get("weight_kg")), "rhr_bpm": _int(r.get("rhr_bpm"))})
+KINDS={"workouts": (Workout, parse_workout, ["kind","distance_km","duration_min","notes"]), "metrics": (Metric, parse_metric, ["weight_kg","rhr_bpm"])}
+def _upsert(model, scope, batch, fields):
+    batch={r["date"]: r for r in batch}
+    existing=dict(model.objects.filter(**scope, date__in=batch).values_list("date","id"))
+    new=[model(**scope, **r) for d, r in batch.items() if d not in existing]
+    old=[model(id=existing[d], **scope, **r) for d, r in batch.items() if d in existing]
+    model.objects.bulk_create(new, batch_size=500); model.objects.bulk_update(old, fields, batch_size=500)
+    return len(new), len(old)
+@transaction.atomic
+def import_rows(rows, kind, owner, plan=None, batch_size=1000):
+    model, parse, fields = KINDS[kind]
+    scope={"plan": plan} if kind=="workouts" else {"owner": owner}
+    result={"rows": 0, "created": 0, "updated": 0, "errors": []}; batch=[]; lo=hi=None
+    def flush():
+        created, updated = _upsert(model, scope, batch, fields)
+        result["created"]+=created; result["updated"]+=updated; batch.clear()
+    for n, raw in enumerate(rows, start=1):
+        result["rows"]=n
+        try: row=parse(json.loads(raw) if isinstance(raw, str) else raw)
+        except (ValueError, TypeError, AttributeError) as e:
+            if len(result["errors"]) < MAX_ERRORS: result["errors"].append({"row": n, "error": str(e)})
+            continue
+        batch.append(row); lo=min(lo or row["date"], row["date"]); hi=max(hi or row["date"], row["date"])
+        if len(batch) >= batch_size: flush()
+    if batch: flush()
+    if lo: refresh(owner.pk, lo, hi)
+    return result
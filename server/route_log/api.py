@@ -2,40 +2,111 @@ from rest_framework import viewsets, permissions, routers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.urls import path, include
+from django.http import Http404
 from django.db import transaction
-from .models import Board, Column, Card, Comment
+from django.db.models import Prefetch
+from django.utils.timezone import now
+from common.audit import record
+from common.filters import exact
+from .models import Board, Column, Card, Comment, board_of, publish_delete, publish_upsert
 from .serializers import BoardSerializer, ColumnSerializer, CardSerializer, CommentSerializer
+from .snapshot import board_snapshots
+from . import ranking, realtime
+from .ranking import next_rank
+def publish_ranks(board_id, column_id, items):
+    if not items: return
+    if column_id is None: realtime.publish(board_id, realtime.event("board", "reorder", id=board_id, columns={c.pk: c.position for c in items}))
+    else: realtime.publish(board_id, realtime.event("order", "reorder", id=column_id, cards={c.pk: c.position for c in items}))
+def publish_departures(board_id, sources):
+    for pk, source in sources.items():
+        if source != board_id: realtime.publish(source, realtime.event("card", "delete", id=pk))
+class PublishDeleteMixin:
+    def perform_destroy(self, instance):
+        with transaction.atomic(): publish_delete(instance); instance.delete()
 class IsOwnerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS: return True
-        owner = getattr(obj, "owner", None) or getattr(getattr(obj, "board", None), "owner", None)
+        board = getattr(obj, "board", None) or getattr(getattr(obj, "column", None), "board", None)
+        owner = getattr(obj, "owner", None) or getattr(board, "owner", None)
         return owner == request.user
 class BoardViewSet(viewsets.ModelViewSet):
     serializer_class = BoardSerializer; permission_classes=[permissions.IsAuthenticated, IsOwnerOrReadOnly]
-    def get_queryset(self): return Board.objects.filter(owner=self.request.user).prefetch_related("columns__cards")
+    trust_token_claims=True
+    cursor_ordering=("-created_at","-id")
+    def get_queryset(self):
+        qs = Board.objects.filter(owner=self.request.user)
+        return qs if self.action=="destroy" else qs.prefetch_related("columns__cards", Prefetch("columns__cards__comments", queryset=Comment.objects.select_related("author")))
     def perform_create(self, serializer): serializer.save(owner=self.request.user)
-class ColumnViewSet(viewsets.ModelViewSet):
+    def include_comments(self): return "comments" in self.request.query_params.get("include","").split(",")
+    @action(detail=False, methods=["get"], url_path="snapshot")
+    def snapshots(self, request):
+        return Response(board_snapshots(Board.objects.filter(owner=request.user), self.include_comments()))
+    @action(detail=True, methods=["get"])
+    def snapshot(self, request, pk=None):
+        rows = board_snapshots(Board.objects.filter(owner=request.user, pk=pk), self.include_comments())
+        if not rows: raise Http404
+        return Response(rows[0])
+class ColumnViewSet(PublishDeleteMixin, viewsets.ModelViewSet):
     serializer_class = ColumnSerializer; permission_classes=[permissions.IsAuthenticated, IsOwnerOrReadOnly]
     queryset = Column.objects.select_related("board")
+    def perform_create(self, serializer):
+        board = serializer.validated_data["board"]
+        with transaction.atomic():
+            position, rebalanced = next_rank(Column.objects.filter(board=board)); serializer.save(position=position)
+            publish_ranks(board.pk, None, rebalanced)
     @action(detail=True, methods=["post"])
     def move(self, request, pk=None):
         column = self.get_object()
-        column.position = int(request.data.get("position", column.position)); column.save()
+        with transaction.atomic():
+            publish_ranks(column.board_id, None, ranking.move(column, Column.objects.filter(board_id=column.board_id), int(request.data.get("position", ranking.END))))
+        record(request.user, "move", "column", column.pk, {"position": column.position})
         return Response(self.get_serializer(column).data)
-class CardViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=["post"])
+    def reorder(self, request, pk=None):
+        column = self.get_object(); moves = request.data.get("moves", [])
+        try: moves = [(int(m["card"]), int(m["position"])) for m in moves]
+        except (TypeError, KeyError, ValueError): return Response({"moves":["expected a list of {card, position}"]}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            order = list(Card.objects.filter(column=column))
+            local = {c.pk: c for c in order}
+            foreign = Card.objects.filter(column__board__owner=request.user).exclude(column=column).select_related("column").in_bulk([pk for pk, _ in moves if pk not in local])
+            sources = {pk: c.column.board_id for pk, c in foreign.items()}
+            cards = {**foreign, **local}
+            missing = [pk for pk, _ in moves if pk not in cards]
+            if missing: return Response({"moves":[f"unknown cards: {missing}"]}, status=status.HTTP_400_BAD_REQUEST)
+            dirty = ranking.apply_moves(order, [(cards[pk], index) for pk, index in moves])
+            changed = ranking.assign_ranks(order, dirty); stamp = now()
+            for c in changed: c.column_id = column.pk; c.updated_at = stamp
+            Card.objects.bulk_update(changed, ["column","position","updated_at"], batch_size=500)
+            publish_departures(column.board_id, sources)
+            for c in foreign.values(): publish_upsert(Card, c)
+            publish_ranks(column.board_id, column.pk, changed)
+        record(request.user, "reorder", "column", column.pk, {"moves": [[pk, index] for pk, index in moves]})
+        return Response({"column": column.pk, "updated": len(changed)})
+class CardViewSet(PublishDeleteMixin, viewsets.ModelViewSet):
     serializer_class = CardSerializer; permission_classes=[permissions.IsAuthenticated, IsOwnerOrReadOnly]
     queryset = Card.objects.select_related("column","column__board")
+    def perform_create(self, serializer):
+        column = serializer.validated_data["column"]
+        with transaction.atomic():
+            position, rebalanced = next_rank(Card.objects.filter(column=column)); serializer.save(position=position)
+            publish_ranks(column.board_id, column.pk, rebalanced)
     @action(detail=True, methods=["post"])
     def move(self, request, pk=None):
-        card = self.get_object()
+        card = self.get_object(); column_id = int(request.data.get("column", card.column_id))
+        if column_id != card.column_id and not Column.objects.filter(pk=column_id, board__owner=request.user).exists():
+            return Response({"column":["unknown column"]}, status=status.HTTP_400_BAD_REQUEST)
         with transaction.atomic():
-            card.column_id = int(request.data.get("column", card.column_id))
-            card.position = int(request.data.get("position", card.position))
-            card.save()
+            source = card.column.board_id; card.column_id = column_id; target = board_of(card)
+            rebalanced = ranking.move(card, Card.objects.filter(column_id=column_id), int(request.data.get("position", ranking.END)), update_fields=["column","position","updated_at"])
+            publish_departures(target, {card.pk: source}); publish_ranks(target, column_id, rebalanced)
+        record(request.user, "move", "card", card.pk, {"column": column_id, "position": card.position})
         return Response(self.get_serializer(card).data)
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(PublishDeleteMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer; permission_classes=[permissions.IsAuthenticated]
-    def get_queryset(self): return Comment.objects.filter(card__column__board__owner=self.request.user)
+    trust_token_claims=True
+    cursor_ordering=("created_at","id")
+    def get_queryset(self): return exact(Comment.objects.filter(card__column__board__owner=self.request.user).select_related("author"), self.request.query_params, card="card_id")
     def perform_create(self, serializer): serializer.save(author=self.request.user)
 router = routers.DefaultRouter()
 router.register(r"boards", BoardViewSet, basename="board")
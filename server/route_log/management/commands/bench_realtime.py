@@ -0,0 +1,43 @@
+import asyncio, random, statistics, threading, time
+from django.core.management.base import BaseCommand
+from ...realtime import Broker, LocalBus, event
+class Command(BaseCommand):
+    help = "Load-test the board event broker: many subscribers, bursty card moves, coalesced delivery. No database access."
+    def add_arguments(self, parser):
+        parser.add_argument("--subscribers", type=int, default=500)
+        parser.add_argument("--workers", type=int, default=4, help="brokers attached to one local bus, standing in for worker processes")
+        parser.add_argument("--bursts", type=int, default=100)
+        parser.add_argument("--burst-size", type=int, default=50)
+        parser.add_argument("--cards", type=int, default=20)
+        parser.add_argument("--window-ms", type=float, default=100)
+        parser.add_argument("--gap-ms", type=float, default=200, help="pause between bursts")
+    async def consume(self, sub, stats, stop):
+        while not stop.is_set():
+            try: batch=await asyncio.wait_for(sub.next_batch(), 0.5)
+            except asyncio.TimeoutError: continue
+            now=time.perf_counter(); stats["batches"]+=1; stats["events"]+=len(batch)
+            stats["latency"].append(now-max(e["data"]["sent"] for e in batch))
+    def publish(self, bus, o, done):
+        rnd=random.Random(1)
+        for _ in range(o["bursts"]):
+            for _ in range(o["burst_size"]):
+                bus.publish(1, [event("card", "upsert", id=rnd.randrange(o["cards"]), position=rnd.randrange(1<<20), sent=time.perf_counter())])
+            time.sleep(o["gap_ms"]/1000)
+        done.set()
+    async def run(self, o):
+        bus=LocalBus(); brokers=[bus.attach(Broker()) for _ in range(o["workers"])]
+        subs=[brokers[i % len(brokers)].subscribe(1, o["window_ms"]/1000) for i in range(o["subscribers"])]
+        stats=[{"batches": 0, "events": 0, "latency": []} for _ in subs]; stop=asyncio.Event(); done=threading.Event()
+        consumers=[asyncio.create_task(self.consume(s, st, stop)) for s, st in zip(subs, stats)]
+        t=time.perf_counter(); publisher=threading.Thread(target=self.publish, args=(bus, o, done)); publisher.start()
+        await asyncio.to_thread(done.wait); await asyncio.sleep(o["window_ms"]/1000*3); stop.set()
+        await asyncio.gather(*consumers); publisher.join(); elapsed=time.perf_counter()-t
+        for s in subs: s.close()
+        return stats, elapsed
+    def handle(self, *args, **o):
+        stats, elapsed = asyncio.run(self.run(o))
+        published=o["bursts"]*o["burst_size"]; lat=sorted(x for st in stats for x in st["latency"])
+        batches=sum(st["batches"] for st in stats); delivered=sum(st["events"] for st in stats)
+        self.stdout.write(f"{o['subscribers']} subscribers on {o['workers']} brokers, {published} events published in {elapsed:.1f}s")
+        self.stdout.write(f"per subscriber: {batches/len(stats):.0f} batches, {delivered/len(stats):.0f} coalesced events ({published*len(stats)/max(delivered,1):.1f}x fewer than raw)")
+        if lat: self.stdout.write(f"delivery latency: p50 {statistics.median(lat)*1000:.1f}ms, p99 {lat[int(len(lat)*0.99)-1]*1000:.1f}ms, max {lat[-1]*1000:.1f}ms")
@@ -0,0 +1,49 @@
+import random, time
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from ...models import Board, Column, Card
+from ... import ranking
+class Command(BaseCommand):
+    help = "Benchmark random card moves on one column with sparse ranks. All writes are rolled back."
+    def add_arguments(self, parser):
+        parser.add_argument("--cards", type=int, default=1000)
+        parser.add_argument("--moves", type=int, default=10000)
+        parser.add_argument("--batch", type=int, default=100, help="moves per bulk reorder call")
+        parser.add_argument("--seed", type=int, default=1)
+    def setup(self, n):
+        owner,_=User.objects.get_or_create(username="bench-reorder")
+        column=Column.objects.create(board=Board.objects.create(owner=owner,name="bench"),name="bench")
+        Card.objects.bulk_create([Card(column=column,title=f"card {i}",position=(i+1)*ranking.GAP) for i in range(n)], batch_size=500)
+        return column, list(Card.objects.filter(column=column).values_list("pk", flat=True))
+    def single(self, column, ids, moves, rnd):
+        rebalances=0; cards=Card.objects.in_bulk(ids)
+        with CaptureQueriesContext(connection) as ctx:
+            t=time.perf_counter()
+            for _ in range(moves):
+                rebalances+=bool(ranking.move(cards[rnd.choice(ids)], Card.objects.filter(column=column), rnd.randrange(len(ids)), update_fields=["position"]))
+            dt=time.perf_counter()-t
+        return dt, len(ctx.captured_queries), rebalances
+    def bulk(self, column, ids, moves, batch, rnd):
+        calls=0
+        with CaptureQueriesContext(connection) as ctx:
+            t=time.perf_counter()
+            for start in range(0, moves, batch):
+                order=list(Card.objects.filter(column=column))
+                cards={c.pk: c for c in order}
+                dirty=ranking.apply_moves(order, [(cards[rnd.choice(ids)], rnd.randrange(len(ids))) for _ in range(min(batch, moves-start))])
+                Card.objects.bulk_update(ranking.assign_ranks(order, dirty), ["position"], batch_size=500); calls+=1
+            dt=time.perf_counter()-t
+        return dt, len(ctx.captured_queries), calls
+    def handle(self, *args, **opts):
+        rnd=random.Random(opts["seed"]); moves=opts["moves"]
+        with transaction.atomic():
+            column, ids = self.setup(opts["cards"])
+            dt, q, rebalances = self.single(column, ids, moves, rnd)
+            self.stdout.write(f"single moves: {moves} in {dt:.2f}s ({moves/dt:,.0f}/s), {q/moves:.2f} queries/move, {rebalances} rebalances")
+            dt, q, calls = self.bulk(column, ids, moves, opts["batch"], rnd)
+            self.stdout.write(f"bulk reorder: {moves} in {dt:.2f}s ({moves/dt:,.0f}/s), {calls} calls, {q/calls:.1f} queries/call")
+            ranks=list(Card.objects.filter(column=column).values_list("position", flat=True))
+            self.stdout.write(f"ranks unique: {len(set(ranks))==len(ranks)}")
+            transaction.set_rollback(True)
@@ -1,11 +1,15 @@
 from django.db import models
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.utils.timezone import now
+from . import realtime
 User = get_user_model()
 class Board(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="boards")
     name = models.CharField(max_length=120)
     created_at = models.DateTimeField(default=now)
+    class Meta: indexes = [models.Index(fields=["owner","created_at"])]
 class Column(models.Model):
     board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name="columns")
     name = models.CharField(max_length=120)
@@ -25,3 +29,22 @@ class Comment(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     body = models.TextField()
     created_at = models.DateTimeField(default=now)
+    class Meta: indexes = [models.Index(fields=["card","created_at"])]
+EVENT_FIELDS={
+    Column: ("board","name","position"),
+    Card: ("column","title","description","position","assignee","created_at","updated_at"),
+    Comment: ("card","author","body","created_at"),
+}
+def board_of(instance):
+    if isinstance(instance, Column): return instance.board_id
+    if isinstance(instance, Card):
+        if Card.column.is_cached(instance) and instance.column.pk == instance.column_id: return instance.column.board_id
+        return Column.objects.filter(pk=instance.column_id).values_list("board_id", flat=True).first()
+    return Card.objects.filter(pk=instance.card_id).values_list("column__board_id", flat=True).first()
+@receiver(post_save, sender=Column)
+@receiver(post_save, sender=Card)
+@receiver(post_save, sender=Comment)
+def publish_upsert(sender, instance, **kwargs):
+    realtime.publish(board_of(instance), realtime.event(sender.__name__.lower(), "upsert", instance, EVENT_FIELDS[sender]))
+def publish_delete(instance):
+    realtime.publish(board_of(instance), realtime.event(type(instance).__name__.lower(), "delete", id=instance.pk))
@@ -0,0 +1,54 @@
+from django.db.models import Max
+GAP=1<<16
+MAX_RANK=2**31-1
+END=MAX_RANK
+def spread(lo, hi, k):
+    if hi is None:
+        ranks=[lo+GAP*(i+1) for i in range(k)]
+        return ranks if ranks[-1] <= MAX_RANK else None
+    step=(hi-lo)/(k+1)
+    if step < 1: return None
+    return [lo+int(step*(i+1)) for i in range(k)]
+def rebalance(items):
+    for i, it in enumerate(items): it.position=(i+1)*GAP
+    return list(items)
+def next_rank(siblings):
+    top=siblings.aggregate(m=Max("position"))["m"]
+    if top is None: return GAP, []
+    ranks=spread(top, None, 1) or spread(top, MAX_RANK+1, 1)
+    if ranks: return ranks[0], []
+    items=rebalance(list(siblings.order_by("position","id")))
+    siblings.model.objects.bulk_update(items, ["position"], batch_size=500)
+    return (len(items)+1)*GAP, items
+def move(obj, siblings, index, update_fields=("position",)):
+    siblings=siblings.exclude(pk=obj.pk).order_by("position","id"); index=max(index,0)
+    near=list(siblings.values_list("position", flat=True)[max(index-1,0):index+1])
+    if index==0: lo, hi = -1, (near[0] if near else None)
+    elif near: lo, hi = near[0], (near[1] if len(near)>1 else None)
+    else: lo, hi = siblings.aggregate(m=Max("position"))["m"], None
+    if lo is None: lo=-1
+    ranks=spread(lo, hi, 1)
+    if ranks:
+        obj.position=ranks[0]; obj.save(update_fields=update_fields)
+        return []
+    items=list(siblings); items.insert(min(index,len(items)), obj)
+    rebalance(items); obj.save(update_fields=update_fields)
+    type(obj).objects.bulk_update([i for i in items if i is not obj], ["position"], batch_size=500)
+    return items
+def apply_moves(order, moves):
+    dirty=set()
+    for obj, index in moves:
+        order[:]=[o for o in order if o.pk!=obj.pk]
+        order.insert(min(max(index,0),len(order)), obj); dirty.add(obj.pk)
+    return dirty
+def assign_ranks(order, dirty):
+    changed=[]; i=0; n=len(order)
+    while i<n:
+        if order[i].pk not in dirty: i+=1; continue
+        j=i
+        while j<n and order[j].pk in dirty: j+=1
+        ranks=spread(order[i-1].position if i else -1, order[j].position if j<n else None, j-i)
+        if ranks is None: return rebalance(order)
+        for o, r in zip(order[i:j], ranks): o.position=r
+        changed+=order[i:j]; i=j
+    return changed
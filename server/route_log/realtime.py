@@ -0,0 +1,118 @@
+import asyncio, json, re, threading
+from collections import defaultdict
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+EVENTS_PATH=re.compile(r"^/api/tracker/boards/(?P<board>\d+)/events/$")
+def _setting(name, default): return getattr(settings, name, default)
+def event(kind, op, obj=None, fields=(), **data):
+    if obj is not None: data={f: getattr(obj, obj._meta.get_field(f).attname) for f in fields}
+    return {"type": kind, "op": op, "id": obj.pk if obj is not None else data.pop("id"), "data": data}
+class Subscription:
+    def __init__(self, broker, board_id, window):
+        self.broker=broker; self.board_id=board_id; self.window=window
+        self.loop=asyncio.get_running_loop(); self.pending={}; self.ready=asyncio.Event()
+    def push(self, events):
+        for e in events:
+            key=(e["type"], e["id"]); prev=self.pending.get(key)
+            if prev and e["op"]=="reorder" and prev["op"]=="reorder":
+                for k, v in e["data"].items(): prev["data"].setdefault(k, {}).update(v)
+                continue
+            self.pending[key]={**e, "data": {k: dict(v) for k, v in e["data"].items()}} if e["op"]=="reorder" else e
+        if self.pending: self.ready.set()
+    async def next_batch(self):
+        await self.ready.wait()
+        if self.window: await asyncio.sleep(self.window)
+        self.ready.clear(); batch=list(self.pending.values()); self.pending={}
+        return batch
+    def close(self): self.broker.unsubscribe(self)
+class Broker:
+    def __init__(self):
+        self.subs=defaultdict(set); self.lock=threading.Lock()
+    def subscribe(self, board_id, window=None):
+        sub=Subscription(self, board_id, _setting("REALTIME_COALESCE_MS", 100)/1000 if window is None else window)
+        with self.lock: self.subs[board_id].add(sub)
+        return sub
+    def unsubscribe(self, sub):
+        with self.lock:
+            self.subs[sub.board_id].discard(sub)
+            if not self.subs[sub.board_id]: del self.subs[sub.board_id]
+    def _fanout(self, subs, events):
+        for sub in subs: sub.push(events)
+    def deliver(self, board_id, events):
+        with self.lock: subs=list(self.subs.get(board_id, ()))
+        by_loop=defaultdict(list)
+        for sub in subs: by_loop[sub.loop].append(sub)
+        for loop, group in by_loop.items():
+            if not loop.is_closed(): loop.call_soon_threadsafe(self._fanout, group, events)
+class LocalBus:
+    def __init__(self): self.brokers=[]
+    def attach(self, broker): self.brokers.append(broker); return broker
+    def publish(self, board_id, events):
+        for broker in self.brokers: broker.deliver(board_id, events)
+class RedisBus(LocalBus):
+    def __init__(self, url, channel="boards"):
+        import redis
+        super().__init__(); self.client=redis.Redis.from_url(url); self.channel=channel; self._listener=None
+    def attach(self, broker):
+        super().attach(broker)
+        if not self._listener: self._listener=threading.Thread(target=self._listen, name="realtime-bus", daemon=True); self._listener.start()
+        return broker
+    def publish(self, board_id, events): self.client.publish(self.channel, json.dumps({"board": board_id, "events": events}, cls=DjangoJSONEncoder))
+    def _listen(self):
+        pubsub=self.client.pubsub(ignore_subscribe_messages=True); pubsub.subscribe(self.channel)
+        for message in pubsub.listen():
+            msg=json.loads(message["data"]); super().publish(msg["board"], msg["events"])
+def _make_bus():
+    url=_setting("REALTIME_REDIS_URL", "")
+    return RedisBus(url) if url else LocalBus()
+bus=_make_bus()
+broker=bus.attach(Broker())
+def publish(board_id, *events):
+    if board_id is not None: transaction.on_commit(lambda: bus.publish(board_id, list(events)))
+def _authorize(token, board_id):
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.tokens import AccessToken
+    from accounts.auth import CachedJWTAuthentication
+    from .models import Board
+    try: user=CachedJWTAuthentication().get_user(AccessToken(token))
+    except (TokenError, AuthenticationFailed): return False
+    return Board.objects.filter(pk=board_id, owner_id=user.pk).exists()
+def _token(scope):
+    token=parse_qs(scope.get("query_string", b"").decode()).get("token", [None])[0]
+    if token: return token
+    auth=dict(scope.get("headers", [])).get(b"authorization", b"").decode()
+    return auth[7:] if auth.startswith("Bearer ") else None
+async def _plain(send, status, text):
+    await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": text.encode()})
+async def _until_disconnect(receive):
+    while (await receive())["type"]!="http.disconnect": pass
+async def board_events(scope, receive, send, board_id):
+    token=_token(scope)
+    if not token: return await _plain(send, 401, "token required")
+    if not await sync_to_async(_authorize)(token, board_id): return await _plain(send, 403, "forbidden")
+    sub=broker.subscribe(board_id); heartbeat=_setting("REALTIME_HEARTBEAT_S", 15)
+    disconnected=asyncio.ensure_future(_until_disconnect(receive)); batch=None
+    try:
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")]})
+        await send({"type": "http.response.body", "body": b"retry: 3000\n\n", "more_body": True})
+        while True:
+            batch=batch or asyncio.ensure_future(sub.next_batch())
+            done, _ = await asyncio.wait({batch, disconnected}, timeout=heartbeat, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done: break
+            if batch in done: body=f"event: batch\ndata: {json.dumps(batch.result(), cls=DjangoJSONEncoder)}\n\n"; batch=None
+            else: body=": ping\n\n"
+            await send({"type": "http.response.body", "body": body.encode(), "more_body": True})
+    finally:
+        sub.close(); disconnected.cancel()
+        if batch: batch.cancel()
+def with_board_events(app):
+    async def router(scope, receive, send):
+        match=EVENTS_PATH.match(scope.get("path", "")) if scope["type"]=="http" else None
+        if match: return await board_events(scope, receive, send, int(match["board"]))
+        return await app(scope, receive, send)
+    return router
@@ -0,0 +1,26 @@
+from collections import defaultdict
+from .models import Column, Card, Comment
+BOARD_FIELDS=("id","name","owner","created_at")
+COLUMN_FIELDS=("id","board","name","position")
+CARD_FIELDS=("id","column","title","description","position","assignee","created_at","updated_at")
+COMMENT_FIELDS=("id","author","author__username","body","created_at")
+def _rows(qs, fields, rename=None):
+    rename = rename or {}
+    return [{rename.get(f, f): v for f, v in zip(fields, row)} for row in qs.values_list(*fields)]
+def _group(rows, key):
+    out=defaultdict(list)
+    for r in rows: out[r[key]].append(r)
+    return out
+def board_snapshots(boards, include_comments=False):
+    board_rows=_rows(boards.order_by("id"), BOARD_FIELDS)
+    ids=[b["id"] for b in board_rows]
+    columns=_rows(Column.objects.filter(board_id__in=ids), COLUMN_FIELDS)
+    cards=_rows(Card.objects.filter(column__board_id__in=ids), CARD_FIELDS)
+    if include_comments:
+        comments=_group(_rows(Comment.objects.filter(card__column__board_id__in=ids).order_by("created_at","id"), ("card",)+COMMENT_FIELDS, {"author__username":"author_username"}), "card")
+        for c in cards: c["comments"]=[{k:v for k,v in r.items() if k!="card"} for r in comments.get(c["id"], ())]
+    by_column=_group(cards, "column")
+    for col in columns: col["cards"]=by_column.get(col["id"], [])
+    by_board=_group(columns, "board")
+    for b in board_rows: b["columns"]=by_board.get(b["id"], [])
+    return board_rows
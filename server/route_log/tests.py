@@ -0,0 +1,123 @@
+import asyncio, json
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from .models import Board, Column, Card, Comment
+from . import realtime
+from .ranking import GAP, MAX_RANK
+class SnapshotQueryTests(TestCase):
+    def setUp(self):
+        self.user=User.objects.create_user("owner"); self.client=APIClient(); self.client.force_authenticate(self.user)
+    def board(self, columns, cards, comments):
+        board=Board.objects.create(owner=self.user, name=f"{columns}x{cards}")
+        cols=Column.objects.bulk_create([Column(board=board, name=f"c{i}", position=(i+1)*GAP) for i in range(columns)])
+        rows=Card.objects.bulk_create([Card(column=c, title=f"t{j}", position=(j+1)*GAP) for c in cols for j in range(cards)])
+        Comment.objects.bulk_create([Comment(card=card, author=self.user, body=f"b{k}") for card in rows for k in range(comments)])
+        return board
+    def get(self, url, queries):
+        with self.assertNumQueries(queries): r=self.client.get(url)
+        self.assertEqual(r.status_code, 200)
+        return r.data
+    def test_detail_query_count_is_flat(self):
+        for size in ((1, 1, 1), (6, 15, 4)):
+            board=self.board(*size); url=f"/api/tracker/boards/{board.pk}/snapshot/"
+            data=self.get(url, 3)
+            self.assertEqual(sum(len(c["cards"]) for c in data["columns"]), size[0]*size[1])
+            data=self.get(url+"?include=comments", 4)
+            self.assertEqual(sum(len(card["comments"]) for c in data["columns"] for card in c["cards"]), size[0]*size[1]*size[2])
+    def test_list_query_count_is_flat(self):
+        self.board(1, 1, 1); self.get("/api/tracker/boards/snapshot/", 3); self.get("/api/tracker/boards/snapshot/?include=comments", 4)
+        for _ in range(4): self.board(5, 10, 3)
+        data=self.get("/api/tracker/boards/snapshot/", 3); self.get("/api/tracker/boards/snapshot/?include=comments", 4)
+        self.assertEqual(len(data), 5)
+class RankLimitTests(TestCase):
+    def setUp(self):
+        self.user=User.objects.create_user("owner"); self.client=APIClient(); self.client.force_authenticate(self.user)
+        self.column=Column.objects.create(board=Board.objects.create(owner=self.user, name="b"), name="todo", position=GAP)
+    def test_append_near_the_limit_stays_in_range(self):
+        Card.objects.bulk_create([Card(column=self.column, title="low", position=GAP), Card(column=self.column, title="high", position=MAX_RANK-GAP//2)])
+        for i in range(40):
+            r=self.client.post("/api/tracker/cards/", {"column": self.column.pk, "title": f"new {i}"}, format="json"); self.assertEqual(r.status_code, 201)
+        titles=list(Card.objects.filter(column=self.column).values_list("title", flat=True))
+        self.assertEqual(titles, ["low", "high"]+[f"new {i}" for i in range(40)])
+        self.assertLessEqual(max(Card.objects.values_list("position", flat=True)), MAX_RANK)
+class DeleteQueryTests(TestCase):
+    def setUp(self):
+        self.user=User.objects.create_user("owner"); self.client=APIClient(); self.client.force_authenticate(self.user)
+    def test_board_delete_is_flat(self):
+        for size in ((1, 1, 1), (6, 15, 4)):
+            board=SnapshotQueryTests.board(self, *size)
+            with CaptureQueriesContext(connection) as ctx: self.assertEqual(self.client.delete(f"/api/tracker/boards/{board.pk}/").status_code, 204)
+            selects=[q["sql"] for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+            self.assertEqual(len(ctx.captured_queries), 8); self.assertEqual(len(selects), 4)
+            self.assertFalse(any("project_tracker_comment" in q for q in selects))
+        self.assertFalse(Comment.objects.exists())
+class RealtimeTests(TestCase):
+    def setUp(self):
+        self.user=User.objects.create_user("owner"); self.client=APIClient(); self.client.force_authenticate(self.user)
+        self.board=Board.objects.create(owner=self.user, name="b"); self.column=Column.objects.create(board=self.board, name="todo", position=GAP)
+    def published(self, method, url=None, data=None):
+        with mock.patch.object(realtime.bus, "publish") as publish, self.captureOnCommitCallbacks(execute=True):
+            if callable(method): method()
+            else: r=getattr(self.client, method)(url, data, format="json"); self.assertLess(r.status_code, 300)
+        return [(board, e["type"], e["op"]) for (board, events), _ in publish.call_args_list for e in events]
+    def test_publish_on_change(self):
+        b=self.board.pk
+        self.assertEqual(self.published("post", "/api/tracker/columns/", {"board": b, "name": "done"}), [(b, "column", "upsert")])
+        self.assertEqual(self.published("post", "/api/tracker/cards/", {"column": self.column.pk, "title": "t"}), [(b, "card", "upsert")])
+        card=Card.objects.get()
+        self.assertEqual(self.published("patch", f"/api/tracker/cards/{card.pk}/", {"title": "u"}), [(b, "card", "upsert")])
+        self.assertEqual(self.published(lambda: Comment.objects.create(card=card, author=self.user, body="hi")), [(b, "comment", "upsert")])
+        comment=Comment.objects.get()
+        self.assertEqual(self.published("delete", f"/api/tracker/comments/{comment.pk}/"), [(b, "comment", "delete")])
+        self.assertEqual(self.published("delete", f"/api/tracker/columns/{self.column.pk}/"), [(b, "column", "delete")])
+    def test_nothing_published_on_rollback(self):
+        with mock.patch.object(realtime.bus, "publish") as publish, self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.client.post("/api/tracker/cards/", {"column": self.column.pk, "title": "t"}, format="json")
+        self.assertEqual(len(callbacks), 1); publish.assert_not_called()
+class SubscriptionTests(TestCase):
+    async def test_coalescing(self):
+        broker=realtime.Broker(); sub=broker.subscribe(1, window=0)
+        sub.push([realtime.event("card", "upsert", id=1, title="a"), realtime.event("order", "reorder", id=5, cards={1: 10})])
+        sub.push([realtime.event("card", "upsert", id=1, title="b"), realtime.event("order", "reorder", id=5, cards={2: 20}), realtime.event("card", "delete", id=2)])
+        batch=await sub.next_batch()
+        self.assertEqual(batch, [{"type": "card", "op": "upsert", "id": 1, "data": {"title": "b"}}, {"type": "order", "op": "reorder", "id": 5, "data": {"cards": {1: 10, 2: 20}}}, {"type": "card", "op": "delete", "id": 2, "data": {}}])
+        self.assertFalse(sub.ready.is_set()); sub.close(); self.assertEqual(dict(broker.subs), {})
+    async def test_deliver_other_board(self):
+        broker=realtime.Broker(); sub=broker.subscribe(1, window=0)
+        broker.deliver(2, [realtime.event("card", "delete", id=9)]); broker.deliver(1, [realtime.event("card", "delete", id=3)])
+        self.assertEqual([e["id"] for e in await asyncio.wait_for(sub.next_batch(), 1)], [3])
+@override_settings(REALTIME_COALESCE_MS=0, REALTIME_HEARTBEAT_S=0.05)
+class StreamTests(TestCase):
+    def setUp(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        from accounts.models import Profile
+        self.user=User.objects.create_user("owner"); Profile.objects.create(user=self.user)
+        self.board=Board.objects.create(owner=self.user, name="b"); self.token=str(AccessToken.for_user(self.user))
+    async def stream(self, query, until=lambda sent: True, board=None):
+        sent=[]; done=asyncio.Event()
+        async def receive(): await done.wait(); return {"type": "http.disconnect"}
+        async def send(message):
+            sent.append(message)
+            if until(sent): done.set()
+        scope={"type": "http", "path": f"/api/tracker/boards/{board or self.board.pk}/events/", "query_string": query.encode(), "headers": []}
+        await asyncio.wait_for(realtime.board_events(scope, receive, send, board or self.board.pk), 2)
+        return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:]).decode()
+    async def test_auth(self):
+        self.assertEqual((await self.stream(""))[0], 401)
+        self.assertEqual((await self.stream("token=garbage"))[0], 403)
+        other=await Board.objects.acreate(owner=await User.objects.acreate(username="other"), name="x")
+        self.assertEqual((await self.stream(f"token={self.token}", board=other.pk))[0], 403)
+    async def test_framing(self):
+        def published(sent):
+            if len(sent)==2: realtime.broker.deliver(self.board.pk, [realtime.event("card", "delete", id=7)])
+            return len(sent) >= 4
+        status, body = await self.stream(f"token={self.token}", published)
+        self.assertEqual(status, 200)
+        frames=body.split("\n\n")
+        self.assertEqual(frames[0], "retry: 3000")
+        self.assertEqual(frames[1], "event: batch\ndata: " + json.dumps([{"type": "card", "op": "delete", "id": 7, "data": {}}]))
+        self.assertEqual(frames[2], ": ping")
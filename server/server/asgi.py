@@ -1,4 +1,6 @@
 import os
 from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE','server.settings')
-application = get_asgi_application()
+django_application = get_asgi_application()
+from project_tracker.realtime import with_board_events
+application = with_board_events(django_application)
@@ -1,6 +1,7 @@
 from pathlib import Path
-import os
+import os, sys
 from datetime import timedelta
+import django
 BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY","dev-not-secret")
 DEBUG = os.environ.get("DJANGO_DEBUG","1") == "1"
@@ -11,7 +12,7 @@ INSTALLED_APPS = [
  "common","accounts","project_tracker","training","shop",
 ]
 MIDDLEWARE = [
- "django.middleware.security.SecurityMiddleware","whitenoise.middleware.WhiteNoiseMiddleware","corsheaders.middleware.CorsMiddleware",
+ "django.middleware.security.SecurityMiddleware","whitenoise.middleware.WhiteNoiseMiddleware","common.metrics.MetricsMiddleware","corsheaders.middleware.CorsMiddleware",
  "django.middleware.common.CommonMiddleware","django.middleware.csrf.CsrfViewMiddleware",
  "django.contrib.sessions.middleware.SessionMiddleware","django.contrib.auth.middleware.AuthenticationMiddleware","django.contrib.messages.middleware.MessageMiddleware","django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -20,13 +21,34 @@ TEMPLATES=[{"BACKEND":"django.template.backends.django.DjangoTemplates","DIRS":[
  "django.template.context_processors.debug","django.template.context_processors.request","django.contrib.auth.context_processors.auth","django.contrib.messages.context_processors.messages"]}}]
 WSGI_APPLICATION="server.wsgi.application"
 ASGI_APPLICATION="server.asgi.application"
-DATABASES={"default":{"ENGINE":"django.db.backends.sqlite3","NAME":BASE_DIR / "db.sqlite3"}}
+DB_PROFILE=os.environ.get("DJANGO_DB_PROFILE","sqlite")
+DB_CONN_MAX_AGE=int(os.environ.get("DJANGO_CONN_MAX_AGE","600"))
+SQLITE_TIMEOUT=float(os.environ.get("SQLITE_TIMEOUT","20"))
+if DB_PROFILE=="postgres":
+    DATABASES={"default":{"ENGINE":"django.db.backends.postgresql","NAME":os.environ.get("POSTGRES_DB","portfolio"),"USER":os.environ.get("POSTGRES_USER","portfolio"),"PASSWORD":os.environ.get("POSTGRES_PASSWORD",""),
+     "HOST":os.environ.get("POSTGRES_HOST","localhost"),"PORT":os.environ.get("POSTGRES_PORT","5432"),"CONN_MAX_AGE":DB_CONN_MAX_AGE,"CONN_HEALTH_CHECKS":True,"OPTIONS":{}}}
+    if os.environ.get("POSTGRES_POOL","0")=="1":
+        DATABASES["default"]["CONN_MAX_AGE"]=0
+        DATABASES["default"]["OPTIONS"]["pool"]={"min_size":int(os.environ.get("POSTGRES_POOL_MIN","2")),"max_size":int(os.environ.get("POSTGRES_POOL_MAX","20")),"timeout":float(os.environ.get("POSTGRES_POOL_TIMEOUT","10"))}
+else:
+    DATABASES={"default":{"ENGINE":"django.db.backends.sqlite3","NAME":os.environ.get("SQLITE_PATH",BASE_DIR / "db.sqlite3"),"CONN_MAX_AGE":DB_CONN_MAX_AGE,"CONN_HEALTH_CHECKS":True,"OPTIONS":{"timeout":SQLITE_TIMEOUT}}}
+    if django.VERSION >= (5,1) and os.environ.get("SQLITE_TRANSACTION_MODE","IMMEDIATE"): DATABASES["default"]["OPTIONS"]["transaction_mode"]=os.environ.get("SQLITE_TRANSACTION_MODE","IMMEDIATE")
+SQLITE_PRAGMAS={} if os.environ.get("SQLITE_TUNING","1")!="1" else {"journal_mode":"wal","busy_timeout":int(SQLITE_TIMEOUT*1000),"synchronous":"normal","mmap_size":int(os.environ.get("SQLITE_MMAP_BYTES",str(256*2**20))),"temp_store":"memory","cache_size":-20000}
+CACHES={"default":{"BACKEND":os.environ.get("DJANGO_CACHE_BACKEND","django.core.cache.backends.locmem.LocMemCache"),"LOCATION":os.environ.get("DJANGO_CACHE_LOCATION","")}}
+STRIPE_API_KEY=os.environ.get("STRIPE_API_KEY"); PAYMENTS_TIMEOUT=float(os.environ.get("PAYMENTS_TIMEOUT","10")); PAYMENTS_MAX_RETRIES=int(os.environ.get("PAYMENTS_MAX_RETRIES","2"))
+MOCK_PAYMENT_LATENCY_MS=float(os.environ.get("MOCK_PAYMENT_LATENCY_MS","0")); MOCK_PAYMENT_JITTER_MS=float(os.environ.get("MOCK_PAYMENT_JITTER_MS","0")); MOCK_PAYMENT_FAILURE_RATE=float(os.environ.get("MOCK_PAYMENT_FAILURE_RATE","0"))
+TESTING=sys.argv[1:2]==["test"]
+AUDIT_ASYNC=os.environ.get("AUDIT_ASYNC","0" if TESTING else "1")=="1"; AUDIT_BATCH_SIZE=int(os.environ.get("AUDIT_BATCH_SIZE","200")); AUDIT_FLUSH_INTERVAL=float(os.environ.get("AUDIT_FLUSH_INTERVAL","1.0")); AUDIT_QUEUE_SIZE=int(os.environ.get("AUDIT_QUEUE_SIZE","10000")); AUDIT_OVERFLOW=os.environ.get("AUDIT_OVERFLOW","drop")
+REALTIME_COALESCE_MS=float(os.environ.get("REALTIME_COALESCE_MS","100")); REALTIME_HEARTBEAT_S=float(os.environ.get("REALTIME_HEARTBEAT_S","15")); REALTIME_REDIS_URL=os.environ.get("REALTIME_REDIS_URL","")
+METRICS_ENABLED=os.environ.get("METRICS_ENABLED","1")=="1"; METRICS_SAMPLE_RATE=float(os.environ.get("METRICS_SAMPLE_RATE","0.05")); METRICS_SLOW_MS=float(os.environ.get("METRICS_SLOW_MS","500")); METRICS_SLOW_SAMPLES=int(os.environ.get("METRICS_SLOW_SAMPLES","50"))
+CATALOG_CACHE=os.environ.get("CATALOG_CACHE","default"); CATALOG_CACHE_TIMEOUT=int(os.environ.get("CATALOG_CACHE_TIMEOUT","3600"))
 LANGUAGE_CODE="en-us"; TIME_ZONE="UTC"; USE_I18N=True; USE_TZ=True
 STATIC_URL="/static/"; STATIC_ROOT=BASE_DIR / "static"
 STORAGES={"staticfiles":{"BACKEND":"whitenoise.storage.CompressedManifestStaticFilesStorage"}}
 CORS_ALLOWED_ORIGINS=["http://localhost:5173","http://127.0.0.1:5173"]; CORS_ALLOW_CREDENTIALS=True
-REST_FRAMEWORK={"DEFAULT_AUTHENTICATION_CLASSES":("rest_framework_simplejwt.authentication.JWTAuthentication",),"DEFAULT_PERMISSION_CLASSES":("rest_framework.permissions.IsAuthenticatedOrReadOnly",),"DEFAULT_SCHEMA_CLASS":"drf_spectacular.openapi.AutoSchema"}
-SIMPLE_JWT={"ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),"REFRESH_TOKEN_LIFETIME": timedelta(days=7),"AUTH_HEADER_TYPES": ("Bearer",)}
+REST_FRAMEWORK={"DEFAULT_AUTHENTICATION_CLASSES":("accounts.auth.CachedJWTAuthentication",),"DEFAULT_PERMISSION_CLASSES":("rest_framework.permissions.IsAuthenticatedOrReadOnly",),"DEFAULT_SCHEMA_CLASS":"drf_spectacular.openapi.AutoSchema","DEFAULT_PAGINATION_CLASS":"common.pagination.KeysetPagination","PAGE_SIZE":50}
+SIMPLE_JWT={"ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),"REFRESH_TOKEN_LIFETIME": timedelta(days=7),"AUTH_HEADER_TYPES": ("Bearer",),"TOKEN_OBTAIN_SERIALIZER":"accounts.serializers.VersionedTokenObtainPairSerializer","TOKEN_REFRESH_SERIALIZER":"accounts.serializers.VersionedTokenRefreshSerializer"}
+AUTH_CACHE=os.environ.get("AUTH_CACHE","default"); AUTH_CACHE_TTL=int(os.environ.get("AUTH_CACHE_TTL","300"))
 SPECTACULAR_SETTINGS={"TITLE":"Portfolio API","DESCRIPTION":"Project Tracker, Training Planner, Shop","VERSION":"1.0.0"}
 DEFAULT_AUTO_FIELD="django.db.models.BigAutoField"
 SECURE_PROXY_SSL_HEADER=("HTTP_X_FORWARDED_PROTO","https")
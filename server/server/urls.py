@@ -11,6 +11,7 @@ urlpatterns = [
  path("api/tracker/", include("project_tracker.api")),
  path("api/training/", include("training.api")),
  path("api/shop/", include("shop.api")),
+ path("api/", include("common.api")),
  path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
  path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="docs"),
 ]
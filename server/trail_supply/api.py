@@ -1,34 +1,72 @@
+import json
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, permissions, routers, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
+from django.http import JsonResponse
 from django.urls import path, include
-from django.conf import settings
-from .models import Product, Order, Payment
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from accounts.auth import CachedJWTAuthentication
+from .models import Product, Order
 from .serializers import ProductSerializer, OrderSerializer, PaymentSerializer
-from .payments import MockGateway, StripeGateway
+from .payments import pay_order, apay_order
+from . import catalog, reports
+from .orders import build_orders
+from common.audit import record
+from common.filters import date_range, exact
 class ProductViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Product.objects.filter(active=True); serializer_class = ProductSerializer; permission_classes=[permissions.AllowAny]
+    def list(self, request):
+        entry = catalog.product_list(lambda: self.get_serializer(self.get_queryset(), many=True).data)
+        if catalog.not_modified(request, entry): return Response(status=status.HTTP_304_NOT_MODIFIED, headers=catalog.headers(entry))
+        return Response(entry["data"], headers=catalog.headers(entry))
 class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer; permission_classes=[permissions.IsAuthenticated]
-    def get_queryset(self): return Order.objects.filter(user=self.request.user).prefetch_related("items__product")
-    def perform_create(self, serializer): serializer.save(user=self.request.user)
+    trust_token_claims=True
+    cursor_ordering=("-created_at","-id")
+    def get_queryset(self): return exact(date_range(Order.objects.filter(user=self.request.user), self.request.query_params, "created_at__date"), self.request.query_params, status="status").prefetch_related("items__product")
+    def perform_create(self, serializer):
+        order = serializer.save(user=self.request.user)
+        record(self.request.user, "create", "order", order.pk, {"total_cents": order.total_cents})
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        orders = request.data.get("orders") if isinstance(request.data, dict) else None
+        if not isinstance(orders, list): return Response({"orders":["expected an object with an orders list"]}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = OrderSerializer(data=orders, many=True); serializer.is_valid(raise_exception=True)
+        orders = build_orders(request.user, [o.get("items", []) for o in serializer.validated_data])
+        for order in orders: record(request.user, "create", "order", order.pk, {"total_cents": order.total_cents, "batch": True})
+        return Response(OrderSerializer(orders, many=True).data, status=status.HTTP_201_CREATED)
     @action(detail=True, methods=["post"])
     def pay(self, request, pk=None):
-        order = self.get_object(); token=request.data.get("token")
-        provider = "stripe" if (getattr(settings,"STRIPE_API_KEY",None) and token) else "mock"
-        gateway = StripeGateway(settings.STRIPE_API_KEY) if provider=="stripe" else MockGateway()
-        result = gateway.charge(order.total_cents, token)
-        pay = Payment.objects.create(order=order, provider=provider, provider_ref=result.ref, amount_cents=order.total_cents, status="succeeded" if result.ok else "failed")
-        if result.ok: order.status="paid"; order.save(); return Response(PaymentSerializer(pay).data)
-        return Response({"detail":"payment_failed"}, status=status.HTTP_402_PAYMENT_REQUIRED)
+        pay = pay_order(self.get_object(), request.data.get("token"))
+        record(request.user, "pay", "order", pay.order_id, {"payment": pay.pk, "status": pay.status, "provider": pay.provider})
+        return Response(*payment_response(pay))
+def payment_response(pay):
+    if pay.status == "succeeded": return PaymentSerializer(pay).data, status.HTTP_200_OK
+    return {"detail":"payment_failed"}, status.HTTP_402_PAYMENT_REQUIRED
+@csrf_exempt
+@require_POST
+async def pay_async(request, pk):
+    try: auth = await sync_to_async(CachedJWTAuthentication().authenticate)(request)
+    except AuthenticationFailed as e: return JsonResponse({"detail": str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    if auth is None: return JsonResponse({"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
+    order = await Order.objects.filter(pk=pk, user=auth[0]).afirst()
+    if order is None: return JsonResponse({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+    try: body = json.loads(request.body or b"{}")
+    except ValueError: return JsonResponse({"detail": "expected a JSON body"}, status=status.HTTP_400_BAD_REQUEST)
+    pay = await apay_order(order, body.get("token") if isinstance(body, dict) else None)
+    await sync_to_async(record)(auth[0], "pay", "order", pay.order_id, {"payment": pay.pk, "status": pay.status, "provider": pay.provider, "async": True})
+    data, code = payment_response(pay)
+    return JsonResponse(data, status=code)
 class ReportsViewSet(viewsets.ViewSet):
     permission_classes=[permissions.IsAuthenticated]
+    trust_token_claims=True
     def list(self, request):
-        qs = Payment.objects.filter(order__user=request.user, status="succeeded")
-        total = sum(p.amount_cents for p in qs); count = qs.count()
-        return Response({"payments": count, "revenue_cents": total})
+        return Response(reports.report(request.user, request.query_params))
 router=routers.DefaultRouter()
 router.register(r"products", ProductViewSet, basename="product")
 router.register(r"orders", OrderViewSet, basename="order")
 router.register(r"reports", ReportsViewSet, basename="reports")
-urlpatterns=[path("", include(router.urls))]
+urlpatterns=[path("orders/<int:pk>/pay-async/", pay_async, name="order-pay-async"), path("", include(router.urls))]
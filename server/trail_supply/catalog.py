@@ -0,0 +1,27 @@
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+VERSION_KEY="catalog:version"
+def backend(): return caches[getattr(settings,"CATALOG_CACHE","default")]
+def version():
+    cache=backend(); v=cache.get(VERSION_KEY)
+    if v is None: cache.add(VERSION_KEY, time.time_ns(), None); v=cache.get(VERSION_KEY) or time.time_ns()
+    return v
+def invalidate(): backend().set(VERSION_KEY, time.time_ns(), None)
+def product_list(build):
+    v=version(); key=f"catalog:list:{v}"; entry=backend().get(key)
+    if entry is None:
+        entry={"etag": quote_etag(f"{v:x}"), "last_modified": v//10**9, "data": list(build())}
+        backend().set(key, entry, getattr(settings,"CATALOG_CACHE_TIMEOUT",3600))
+    return entry
+def settled(entry): return time.time() >= entry["last_modified"]+1
+def headers(entry):
+    out={"ETag": entry["etag"], "Cache-Control": "public, max-age=0, must-revalidate"}
+    if settled(entry): out["Last-Modified"]=http_date(entry["last_modified"])
+    return out
+def not_modified(request, entry):
+    inm=request.headers.get("If-None-Match")
+    if inm is not None: return inm.strip()=="*" or entry["etag"] in [t.strip().removeprefix("W/") for t in inm.split(",")]
+    ims=parse_http_date_safe(request.headers.get("If-Modified-Since") or "")
+    return ims is not None and entry["last_modified"] <= ims
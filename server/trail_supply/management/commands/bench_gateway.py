@@ -0,0 +1,31 @@
+import asyncio, time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from ...payments import MockGateway
+class Command(BaseCommand):
+    help = "Measure charge throughput against a slow/flaky mock provider, sync threads vs async."
+    def add_arguments(self, parser):
+        parser.add_argument("--charges", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--latency-ms", type=float, default=200)
+        parser.add_argument("--jitter-ms", type=float, default=50)
+        parser.add_argument("--failure-rate", type=float, default=0.05)
+    def gateway(self, o): return MockGateway(o["latency_ms"], o["jitter_ms"], o["failure_rate"], seed=1)
+    def report(self, label, n, dt, results):
+        failed=sum(not r.ok for r in results)
+        self.stdout.write(f"{label:>6}: {n} charges in {dt:.2f}s = {n/dt:,.0f}/s, {failed} failed")
+    async def run_async(self, gw, n, concurrency):
+        sem=asyncio.Semaphore(concurrency)
+        async def one(i):
+            async with sem: return await gw.acharge(1000, None, f"bench-{i}")
+        return await asyncio.gather(*(one(i) for i in range(n)))
+    def handle(self, *args, **o):
+        n=o["charges"]; c=o["concurrency"]
+        gw=self.gateway(o); t=time.perf_counter()
+        with ThreadPoolExecutor(c) as pool: results=list(pool.map(lambda i: gw.charge(1000, None, f"bench-{i}"), range(n)))
+        self.report("sync", n, time.perf_counter()-t, results)
+        gw=self.gateway(o); t=time.perf_counter()
+        results=asyncio.run(self.run_async(gw, n, c))
+        self.report("async", n, time.perf_counter()-t, results)
+        t=time.perf_counter(); again=asyncio.run(self.run_async(gw, n, c))
+        self.stdout.write(f"replay: {sum(a.ref==b.ref for a,b in zip(results, again))}/{n} idempotent hits in {time.perf_counter()-t:.2f}s")
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import transaction
+from ...models import DailyRevenue, DailyProductRevenue
+from ...reports import raw_daily, raw_products
+DAY_KEY=("user","day"); PRODUCT_KEY=("user","day","product")
+def _index(rows, key, fields): return {tuple(r[k] for k in key): tuple(r[f] for f in fields) for r in rows}
+class Command(BaseCommand):
+    help = "Rebuild daily revenue rollups from raw payments, or --verify them without writing."
+    def add_arguments(self, parser):
+        parser.add_argument("--verify", action="store_true")
+        parser.add_argument("--user", help="limit to one username")
+    def handle(self, *args, **opts):
+        users=None
+        if opts["user"]:
+            users=User.objects.filter(username=opts["user"])
+            if not users.exists(): raise CommandError(f"no such user: {opts['user']}")
+        days=DailyRevenue.objects.all(); products=DailyProductRevenue.objects.all()
+        if users is not None: days=days.filter(user__in=users); products=products.filter(user__in=users)
+        if opts["verify"]: return self.verify(users, days, products)
+        with transaction.atomic():
+            days.delete(); products.delete()
+            d=DailyRevenue.objects.bulk_create([DailyRevenue(user_id=r["user"],day=r["day"],payments=r["payments"],revenue_cents=r["revenue_cents"]) for r in raw_daily(users)], batch_size=1000)
+            p=DailyProductRevenue.objects.bulk_create([DailyProductRevenue(user_id=r["user"],day=r["day"],product_id=r["product"],units=r["units"],revenue_cents=r["revenue_cents"]) for r in raw_products(users)], batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(d)} daily and {len(p)} daily-product rollups"))
+    def verify(self, users, days, products):
+        bad=0
+        for label, raw, rolled, key, fields in (
+            ("daily", raw_daily(users), days.values("user","day","payments","revenue_cents"), DAY_KEY, ("payments","revenue_cents")),
+            ("product", raw_products(users), products.values("user","day","product","units","revenue_cents"), PRODUCT_KEY, ("units","revenue_cents"))):
+            want=_index(raw, key, fields); have=_index(rolled, key, fields)
+            for k in sorted(want.keys() | have.keys(), key=str):
+                if want.get(k)!=have.get(k):
+                    bad+=1; self.stdout.write(f"{label} {dict(zip(key,k))}: raw={want.get(k)} rollup={have.get(k)}")
+        if bad: raise CommandError(f"{bad} rollup rows disagree with raw payments; run rollup_revenue to rebuild")
+        self.stdout.write(self.style.SUCCESS("Rollups match raw payments"))
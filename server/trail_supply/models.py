@@ -1,17 +1,23 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.utils.timezone import now
+from . import catalog
 User = get_user_model()
 class Product(models.Model):
     name = models.CharField(max_length=200)
     price_cents = models.PositiveIntegerField()
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(default=now)
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_catalog(**kwargs): transaction.on_commit(catalog.invalidate)
 class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(default=now)
     total_cents = models.PositiveIntegerField(default=0)
     status = models.CharField(max_length=20, default="pending")
+    class Meta: indexes = [models.Index(fields=["user","created_at"]), models.Index(fields=["user","status","created_at"])]
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
@@ -24,3 +30,16 @@ class Payment(models.Model):
     amount_cents = models.PositiveIntegerField()
     status = models.CharField(max_length=20, default="initiated")
     created_at = models.DateTimeField(default=now)
+class DailyRevenue(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    day = models.DateField()
+    payments = models.PositiveIntegerField(default=0)
+    revenue_cents = models.PositiveBigIntegerField(default=0)
+    class Meta: constraints = [models.UniqueConstraint(fields=["user","day"], name="daily_revenue_user_day")]
+class DailyProductRevenue(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    units = models.PositiveIntegerField(default=0)
+    revenue_cents = models.PositiveBigIntegerField(default=0)
+    class Meta: constraints = [models.UniqueConstraint(fields=["user","day","product"], name="daily_product_revenue_key")]
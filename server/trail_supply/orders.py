@@ -0,0 +1,34 @@
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from rest_framework.exceptions import ValidationError
+from .models import Product, Order, OrderItem
+MAX_BATCH=1000
+def _line_errors(items, products):
+    errors=[{} for _ in items]
+    for err, it in zip(errors, items):
+        product=products.get(it["product_id"])
+        if product is None: err["product_id"]=[f"Invalid pk \"{it['product_id']}\" - object does not exist."]
+        elif not product.active: err["product_id"]=[f"Product {product.pk} is not available."]
+    return errors if any(errors) else None
+def build_orders(user, carts):
+    if len(carts) > MAX_BATCH: raise ValidationError({"orders": [f"at most {MAX_BATCH} orders per batch"]})
+    products=Product.objects.in_bulk({it["product_id"] for items in carts for it in items})
+    errors=[_line_errors(items, products) for items in carts]
+    if any(errors): raise ValidationError([{"items": e} if e else {} for e in errors])
+    orders=[]; lines=[]
+    for items in carts:
+        order=Order(user=user); order_lines=[]
+        for it in items:
+            product=products[it["product_id"]]; qty=it.get("quantity",1)
+            order_lines.append(OrderItem(order=order, product=product, quantity=qty, line_total_cents=product.price_cents*qty))
+        order.total_cents=sum(l.line_total_cents for l in order_lines); orders.append(order); lines.append(order_lines)
+    with transaction.atomic():
+        Order.objects.bulk_create(orders)
+        for order, order_lines in zip(orders, lines):
+            for line in order_lines: line.order=order
+        OrderItem.objects.bulk_create([l for order_lines in lines for l in order_lines], batch_size=500)
+    prefetch_related_objects(orders, "items__product")
+    return orders
+def build_order(user, items):
+    try: return build_orders(user, [items])[0]
+    except ValidationError as e: raise ValidationError(e.detail[0]) from e
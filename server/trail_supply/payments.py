@@ -1,17 +1,103 @@
+import abc, asyncio, hashlib, random, time, uuid
+from collections import OrderedDict
 from dataclasses import dataclass
+from functools import lru_cache
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils.timezone import now
+from .models import Payment
+from . import reports
 @dataclass
 class PaymentResult: ok: bool; ref: str
-class MockGateway:
-    def charge(self, amount_cents: int, token: str | None = None) -> PaymentResult:
-        return PaymentResult(ok=True, ref="MOCK-12345")
+class GatewayError(Exception): pass
+class Gateway(abc.ABC):
+    provider = "mock"
+    @abc.abstractmethod
+    def charge(self, amount_cents: int, token: str | None = None, idempotency_key: str | None = None) -> PaymentResult: ...
+    async def acharge(self, amount_cents: int, token: str | None = None, idempotency_key: str | None = None) -> PaymentResult:
+        return await asyncio.to_thread(self.charge, amount_cents, token, idempotency_key)
+class MockGateway(Gateway):
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, failure_rate: float = 0.0, seed: int | None = None, max_keys: int = 10000):
+        self.latency_ms=latency_ms; self.jitter_ms=jitter_ms; self.failure_rate=failure_rate; self.max_keys=max_keys
+        self.rng=random.Random(seed); self.seen: OrderedDict[str, PaymentResult] = OrderedDict()
+    def _outcome(self, key):
+        if key in self.seen: self.seen.move_to_end(key); return 0, self.seen[key]
+        delay=(self.latency_ms + self.rng.uniform(0, self.jitter_ms)) / 1000
+        result=PaymentResult(ok=self.rng.random() >= self.failure_rate, ref=f"MOCK-{uuid.uuid4().hex[:12]}")
+        if key:
+            self.seen[key]=result
+            if len(self.seen) > self.max_keys: self.seen.popitem(last=False)
+        return delay, result
+    def charge(self, amount_cents: int, token: str | None = None, idempotency_key: str | None = None) -> PaymentResult:
+        delay, result = self._outcome(idempotency_key)
+        if delay: time.sleep(delay)
+        return result
+    async def acharge(self, amount_cents: int, token: str | None = None, idempotency_key: str | None = None) -> PaymentResult:
+        delay, result = self._outcome(idempotency_key)
+        if delay: await asyncio.sleep(delay)
+        return result
 try:
     import stripe
 except Exception:
     stripe = None
-class StripeGateway:
-    def __init__(self, api_key: str):
+class StripeGateway(Gateway):
+    provider = "stripe"
+    def __init__(self, api_key: str, timeout: float = 10, max_retries: int = 0):
         if not stripe: raise RuntimeError("Stripe not installed")
-        stripe.api_key = api_key
-    def charge(self, amount_cents: int, token: str) -> PaymentResult:
-        intent = stripe.PaymentIntent.create(amount=amount_cents, currency="usd", payment_method=token, confirm=True)
-        return PaymentResult(ok=intent["status"]=="succeeded", ref=intent["id"])
+        try: http, self.native_async = stripe.HTTPXClient(timeout=timeout), True
+        except Exception: http, self.native_async = stripe.RequestsClient(timeout=timeout), False
+        self.client = stripe.StripeClient(api_key, http_client=http, max_network_retries=max_retries)
+    def _params(self, amount_cents, token): return {"amount": amount_cents, "currency": "usd", "payment_method": token, "confirm": True}
+    def _result(self, intent): return PaymentResult(ok=intent["status"]=="succeeded", ref=intent["id"])
+    def _declined(self, e):
+        if isinstance(e, stripe.CardError): return PaymentResult(ok=False, ref=((getattr(e.error, "payment_intent", None) or {}).get("id") or ""))
+        raise GatewayError(str(e)) from e
+    def charge(self, amount_cents: int, token: str | None = None, idempotency_key: str | None = None) -> PaymentResult:
+        try: return self._result(self.client.payment_intents.create(params=self._params(amount_cents, token), options={"idempotency_key": idempotency_key} if idempotency_key else {}))
+        except stripe.StripeError as e: return self._declined(e)
+    async def acharge(self, amount_cents: int, token: str | None = None, idempotency_key: str | None = None) -> PaymentResult:
+        if not self.native_async: return await super().acharge(amount_cents, token, idempotency_key)
+        try: return self._result(await self.client.payment_intents.create_async(params=self._params(amount_cents, token), options={"idempotency_key": idempotency_key} if idempotency_key else {}))
+        except stripe.StripeError as e: return self._declined(e)
+@lru_cache(maxsize=None)
+def get_gateway(provider: str) -> Gateway:
+    if provider == "stripe": return StripeGateway(settings.STRIPE_API_KEY, timeout=getattr(settings,"PAYMENTS_TIMEOUT",10), max_retries=getattr(settings,"PAYMENTS_MAX_RETRIES",0))
+    return MockGateway(getattr(settings,"MOCK_PAYMENT_LATENCY_MS",0), getattr(settings,"MOCK_PAYMENT_JITTER_MS",0), getattr(settings,"MOCK_PAYMENT_FAILURE_RATE",0.0))
+def choose_provider(token: str | None) -> str:
+    return "stripe" if (getattr(settings,"STRIPE_API_KEY",None) and token) else "mock"
+def idempotency_key(order, token: str | None = None, prior: Payment | None = None) -> str:
+    key = f"order-{order.pk}-{order.total_cents}"
+    if token: key += "-" + hashlib.sha256(token.encode()).hexdigest()[:16]
+    if prior and prior.status == "failed": key += f"-after-{prior.provider_ref or int(prior.created_at.timestamp()*1000)}"
+    return key
+def _prior(order): return Payment.objects.filter(order=order).first()
+def _record(order, provider, result):
+    fields = dict(provider=provider, provider_ref=result.ref if result else "", amount_cents=order.total_cents, status="error" if result is None else "succeeded" if result.ok else "failed", created_at=now())
+    with transaction.atomic():
+        pay = Payment.objects.select_for_update().filter(order=order).first()
+        if pay and pay.status == "succeeded": return pay
+        if pay:
+            for k, v in fields.items(): setattr(pay, k, v)
+            pay.save()
+        else:
+            try:
+                with transaction.atomic(): pay = Payment.objects.create(order=order, **fields)
+            except IntegrityError: return Payment.objects.get(order=order)
+        if result and result.ok:
+            reports.record_payment(pay); order.status = "paid"; order.save(update_fields=["status"])
+    return pay
+def pay_order(order, token: str | None = None) -> Payment:
+    prior = _prior(order)
+    if prior and prior.status == "succeeded": return prior
+    provider = choose_provider(token)
+    try: result = get_gateway(provider).charge(order.total_cents, token, idempotency_key(order, token, prior))
+    except (GatewayError, TimeoutError, ConnectionError): result = None
+    return _record(order, provider, result)
+async def apay_order(order, token: str | None = None) -> Payment:
+    prior = await sync_to_async(_prior)(order)
+    if prior and prior.status == "succeeded": return prior
+    provider = choose_provider(token)
+    try: result = await get_gateway(provider).acharge(order.total_cents, token, idempotency_key(order, token, prior))
+    except (GatewayError, TimeoutError, ConnectionError): result = None
+    return await sync_to_async(_record)(order, provider, result)
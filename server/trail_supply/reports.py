@@ -0,0 +1,48 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils.timezone import localdate
+from rest_framework.exceptions import ValidationError
+from common.filters import date_param
+from .models import Payment, OrderItem, DailyRevenue, DailyProductRevenue
+GROUPS=("day","product")
+def _bump(model, key, **deltas):
+    if model.objects.filter(**key).update(**{f: F(f)+v for f, v in deltas.items()}): return
+    try:
+        with transaction.atomic(): model.objects.create(**key, **deltas)
+    except IntegrityError:
+        model.objects.filter(**key).update(**{f: F(f)+v for f, v in deltas.items()})
+def record_payment(payment):
+    if payment.status!="succeeded": return
+    user_id=payment.order.user_id; day=localdate(payment.created_at)
+    with transaction.atomic():
+        _bump(DailyRevenue, dict(user_id=user_id, day=day), payments=1, revenue_cents=payment.amount_cents)
+        for line in OrderItem.objects.filter(order_id=payment.order_id).values("product").annotate(units=Sum("quantity"), revenue=Sum("line_total_cents")):
+            _bump(DailyProductRevenue, dict(user_id=user_id, day=day, product_id=line["product"]), units=line["units"], revenue_cents=line["revenue"])
+def raw_daily(users=None):
+    qs=Payment.objects.filter(status="succeeded")
+    if users is not None: qs=qs.filter(order__user__in=users)
+    return qs.annotate(day=TruncDate("created_at")).values("day", user=F("order__user")).annotate(payments=Count("id"), revenue_cents=Sum("amount_cents")).order_by()
+def raw_products(users=None):
+    qs=OrderItem.objects.filter(order__payment__status="succeeded")
+    if users is not None: qs=qs.filter(order__user__in=users)
+    return qs.annotate(day=TruncDate("order__payment__created_at")).values("day","product", user=F("order__user")).annotate(units=Sum("quantity"), revenue_cents=Sum("line_total_cents")).order_by()
+def totals(user):
+    return Payment.objects.filter(order__user=user, status="succeeded").aggregate(payments=Count("id"), revenue_cents=Coalesce(Sum("amount_cents"), 0))
+def report(user, params):
+    start, end, group = date_param(params, "from"), date_param(params, "to"), params.get("group_by")
+    if group and group not in GROUPS: raise ValidationError({"group_by": [f"choose one of: {', '.join(GROUPS)}"]})
+    if not (start or end or group): return totals(user)
+    window={"user": user}
+    if start: window["day__gte"]=start
+    if end: window["day__lte"]=end
+    days=DailyRevenue.objects.filter(**window)
+    out={"from": start, "to": end, "group_by": group}
+    if group=="day":
+        rows=list(days.order_by("day").values("day","payments","revenue_cents"))
+        out.update(payments=sum(r["payments"] for r in rows), revenue_cents=sum(r["revenue_cents"] for r in rows), breakdown=rows)
+        return out
+    out.update(days.aggregate(payments=Coalesce(Sum("payments"), 0), revenue_cents=Coalesce(Sum("revenue_cents"), 0)))
+    if group=="product":
+        out["breakdown"]=list(DailyProductRevenue.objects.filter(**window).values("product", name=F("product__name")).annotate(units=Sum("units"), revenue_cents=Sum("revenue_cents")).order_by("-revenue_cents","product"))
+    return out
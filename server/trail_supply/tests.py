@@ -0,0 +1,156 @@
+import io
+from datetime import date, datetime, timezone
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+from . import catalog, payments, reports
+from .models import Product, Order, OrderItem, Payment, DailyRevenue, DailyProductRevenue
+from .orders import build_order
+class Clock:
+    def __init__(self, seconds): self.ns=int(seconds*10**9)
+    def time_ns(self): return self.ns
+    def time(self): return self.ns/10**9
+    def advance(self, seconds): self.ns+=int(seconds*10**9)
+class CatalogCacheTests(TestCase):
+    url="/api/shop/products/"
+    def setUp(self):
+        catalog.backend().clear(); self.client=APIClient()
+        self.clock=Clock(1_700_000_000.2); patcher=mock.patch.object(catalog, "time", self.clock); patcher.start(); self.addCleanup(patcher.stop)
+        Product.objects.create(name="Trail mix", price_cents=500)
+    def get(self, **headers): return self.client.get(self.url, headers=headers)
+    def change(self, fn):
+        self.clock.advance(0.1)
+        with self.captureOnCommitCallbacks(execute=True): fn()
+    def test_etag_revalidation(self):
+        first=self.get(); self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.get(**{"If-None-Match": first["ETag"]}).status_code, 304)
+    def test_create_update_delete_invalidate(self):
+        etags=[self.get()["ETag"]]
+        def revalidate():
+            r=self.get(**{"If-None-Match": etags[-1]})
+            self.assertEqual(r.status_code, 200); self.assertNotIn(r["ETag"], etags); etags.append(r["ETag"])
+            return r
+        self.change(lambda: Product.objects.create(name="Gel", price_cents=150)); revalidate()
+        gel=Product.objects.get(name="Gel"); gel.price_cents=175
+        self.change(gel.save); self.assertIn(175, [p["price_cents"] for p in revalidate().data])
+        self.change(gel.delete); self.assertEqual([p["name"] for p in revalidate().data], ["Trail mix"])
+    def test_last_modified_waits_for_the_second_to_close(self):
+        first=self.get(); self.assertNotIn("Last-Modified", first)
+        self.change(lambda: Product.objects.create(name="Gel", price_cents=150))
+        self.assertNotIn("Last-Modified", self.get())
+        self.clock.advance(1)
+        settled=self.get(); self.assertIn("Last-Modified", settled)
+        self.assertEqual(self.get(**{"If-Modified-Since": settled["Last-Modified"]}).status_code, 304)
+        self.change(lambda: Product.objects.create(name="Bar", price_cents=250))
+        fresh=self.get(**{"If-Modified-Since": settled["Last-Modified"]})
+        self.assertEqual(fresh.status_code, 200); self.assertEqual(len(fresh.data), 3)
+class Failing(payments.Gateway):
+    def charge(self, amount_cents, token=None, idempotency_key=None): raise payments.GatewayError("timeout")
+class PaymentTests(TestCase):
+    def setUp(self):
+        self.user=User.objects.create_user("buyer"); self.client=APIClient(); self.client.force_authenticate(self.user)
+        self.order=build_order(self.user, [{"product_id": Product.objects.create(name="Gel", price_cents=150).pk, "quantity": 2}])
+    def gateway(self, gw): patcher=mock.patch.object(payments, "get_gateway", lambda provider: gw); patcher.start(); self.addCleanup(patcher.stop); return gw
+    def pay(self, token=None): return self.client.post(f"/api/shop/orders/{self.order.pk}/pay/", {"token": token} if token else {}, format="json")
+    def test_duplicate_pay_replays_the_payment(self):
+        gw=self.gateway(payments.MockGateway(failure_rate=0.0, seed=1))
+        first=self.pay(); second=self.pay()
+        self.assertEqual((first.status_code, second.status_code), (200, 200)); self.assertEqual(first.data["id"], second.data["id"])
+        self.assertEqual(len(gw.seen), 1); self.assertEqual(Payment.objects.count(), 1)
+        self.assertEqual(DailyRevenue.objects.get().payments, 1)
+    def test_retry_after_failure_uses_a_new_key(self):
+        gw=self.gateway(payments.MockGateway(failure_rate=1.0, seed=1))
+        self.assertEqual(self.pay().status_code, 402); self.assertEqual(Payment.objects.get().status, "failed")
+        gw.failure_rate=0.0
+        self.assertEqual(self.pay().status_code, 200); self.assertEqual(len(gw.seen), 2)
+        self.assertEqual(Order.objects.get().status, "paid")
+    def test_key_depends_on_card_and_prior_failure(self):
+        base=payments.idempotency_key(self.order)
+        self.assertEqual(base, payments.idempotency_key(self.order))
+        self.assertNotEqual(payments.idempotency_key(self.order, "tok_a"), payments.idempotency_key(self.order, "tok_b"))
+        failed=Payment(order=self.order, provider_ref="MOCK-1", amount_cents=300, status="failed")
+        errored=Payment(order=self.order, amount_cents=300, status="error")
+        self.assertTrue(payments.idempotency_key(self.order, None, failed).endswith("-after-MOCK-1"))
+        self.assertEqual(payments.idempotency_key(self.order, None, errored), base)
+    def test_concurrent_success_is_recorded_once(self):
+        ok=payments.PaymentResult(ok=True, ref="MOCK-a")
+        first=payments._record(self.order, "mock", ok); second=payments._record(self.order, "mock", payments.PaymentResult(ok=True, ref="MOCK-b"))
+        self.assertEqual(first.pk, second.pk); self.assertEqual(second.provider_ref, "MOCK-a")
+        self.assertEqual(DailyRevenue.objects.get().payments, 1)
+    def test_gateway_error_is_a_402(self):
+        self.gateway(Failing())
+        self.assertEqual(self.pay("tok_a").status_code, 402); self.assertEqual(Payment.objects.get().status, "error")
+    async def test_async_pay(self):
+        gw=self.gateway(payments.MockGateway(failure_rate=0.0, seed=1))
+        r=await self.async_client.post(f"/api/shop/orders/{self.order.pk}/pay-async/", {}, content_type="application/json")
+        self.assertEqual(r.status_code, 401)
+        with mock.patch("accounts.auth.CachedJWTAuthentication.authenticate", return_value=(self.user, None)):
+            r=await self.async_client.post(f"/api/shop/orders/{self.order.pk}/pay-async/", {}, content_type="application/json")
+            again=await self.async_client.post(f"/api/shop/orders/{self.order.pk}/pay-async/", {}, content_type="application/json")
+        self.assertEqual((r.status_code, again.status_code), (200, 200)); self.assertEqual(r.json()["id"], again.json()["id"]); self.assertEqual(len(gw.seen), 1)
+class RevenueRollupTests(TestCase):
+    url="/api/shop/reports/"
+    def setUp(self):
+        self.user=User.objects.create_user("buyer"); self.other=User.objects.create_user("other"); self.client=APIClient(); self.client.force_authenticate(self.user)
+        self.gel=Product.objects.create(name="Gel", price_cents=150); self.bar=Product.objects.create(name="Bar", price_cents=300)
+        for user, day, hour, ok, items in [(self.user, 1, 9, True, [(self.gel, 2)]), (self.user, 1, 23, True, [(self.gel, 1), (self.bar, 1)]), (self.user, 2, 0, True, [(self.bar, 3)]),
+                                           (self.user, 2, 12, False, [(self.bar, 5)]), (self.other, 1, 10, True, [(self.gel, 4)])]:
+            order=Order.objects.create(user=user, total_cents=sum(p.price_cents*q for p, q in items))
+            OrderItem.objects.bulk_create([OrderItem(order=order, product=p, quantity=q, line_total_cents=p.price_cents*q) for p, q in items])
+            reports.record_payment(Payment.objects.create(order=order, provider_ref=f"MOCK-{order.pk}", amount_cents=order.total_cents, status="succeeded" if ok else "failed", created_at=datetime(2024, 5, day, hour, 30, tzinfo=timezone.utc)))
+    def rolled(self):
+        days={(r.user_id, r.day): (r.payments, r.revenue_cents) for r in DailyRevenue.objects.all()}
+        products={(r.user_id, r.day, r.product_id): (r.units, r.revenue_cents) for r in DailyProductRevenue.objects.all()}
+        return days, products
+    def raw(self):
+        return ({(r["user"], r["day"]): (r["payments"], r["revenue_cents"]) for r in reports.raw_daily()},
+                {(r["user"], r["day"], r["product"]): (r["units"], r["revenue_cents"]) for r in reports.raw_products()})
+    def test_rollups_match_raw(self):
+        days, products = self.rolled()
+        self.assertEqual((days, products), self.raw())
+        self.assertEqual(days[(self.user.pk, date(2024,5,1))], (2, 750)); self.assertEqual(days[(self.user.pk, date(2024,5,2))], (1, 900))
+        self.assertEqual(products[(self.user.pk, date(2024,5,1), self.gel.pk)], (3, 450))
+    def test_report(self):
+        self.assertEqual(self.client.get(self.url).data, {"payments": 3, "revenue_cents": 1650})
+        r=self.client.get(self.url, {"from": "2024-05-02", "group_by": "day"}).data
+        self.assertEqual((r["payments"], r["revenue_cents"], [b["day"] for b in r["breakdown"]]), (1, 900, [date(2024,5,2)]))
+        r=self.client.get(self.url, {"to": "2024-05-01", "group_by": "product"}).data
+        self.assertEqual(r["breakdown"], [{"product": self.gel.pk, "name": "Gel", "units": 3, "revenue_cents": 450}, {"product": self.bar.pk, "name": "Bar", "units": 1, "revenue_cents": 300}])
+        self.assertEqual(self.client.get(self.url, {"from": "2024-05-01", "to": "2024-05-31"}).data["revenue_cents"], 1650)
+    def test_report_validation(self):
+        for params, field in [({"group_by": "week"}, "group_by"), ({"from": "2024-13-01"}, "from"), ({"to": "yesterday"}, "to"), ({"from": "2024-02-30"}, "from")]:
+            r=self.client.get(self.url, params); self.assertEqual(r.status_code, 400); self.assertIn(field, r.data)
+    def test_verify_and_rebuild(self):
+        out=io.StringIO(); call_command("rollup_revenue", "--verify", stdout=out); self.assertIn("match", out.getvalue())
+        DailyRevenue.objects.filter(user=self.user, day=date(2024,5,1)).update(revenue_cents=1); DailyProductRevenue.objects.filter(product=self.bar).delete()
+        with self.assertRaisesMessage(CommandError, "3 rollup rows disagree"): call_command("rollup_revenue", "--verify", stdout=io.StringIO())
+        call_command("rollup_revenue", "--verify", "--user", "other", stdout=io.StringIO())
+        call_command("rollup_revenue", "--user", "buyer", stdout=io.StringIO())
+        self.assertEqual(self.rolled(), self.raw())
+        with self.assertRaisesMessage(CommandError, "no such user"): call_command("rollup_revenue", "--user", "nobody")
+class BatchOrderTests(TestCase):
+    url="/api/shop/orders/batch/"
+    def setUp(self):
+        self.user=User.objects.create_user("buyer"); self.client=APIClient(); self.client.force_authenticate(self.user)
+        self.gel=Product.objects.create(name="Gel", price_cents=150); self.old=Product.objects.create(name="Old", price_cents=100, active=False)
+    def post(self, body): return self.client.post(self.url, body, format="json")
+    def cart(self, product_id, quantity=1): return {"items": [{"product_id": product_id, "quantity": quantity}]}
+    def test_batch(self):
+        r=self.post({"orders": [self.cart(self.gel.pk, 2), self.cart(self.gel.pk)]})
+        self.assertEqual(r.status_code, 201); self.assertEqual([o["total_cents"] for o in r.data], [300, 150])
+        self.assertEqual(r.data[0]["items"][0]["product"]["name"], "Gel"); self.assertEqual(Order.objects.count(), 2)
+    def test_all_or_nothing(self):
+        r=self.post({"orders": [self.cart(self.gel.pk), self.cart(self.old.pk), self.cart(9999)]})
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.data[0], {}); self.assertIn("not available", str(r.data[1]["items"][0]["product_id"])); self.assertIn("does not exist", str(r.data[2]["items"][0]["product_id"]))
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(self.post({"orders": [self.cart(self.gel.pk), self.cart(self.gel.pk, -1)]}).status_code, 400); self.assertFalse(Order.objects.exists())
+    def test_max_batch(self):
+        with mock.patch("shop.orders.MAX_BATCH", 2):
+            r=self.post({"orders": [self.cart(self.gel.pk)]*3})
+        self.assertEqual(r.status_code, 400); self.assertIn("orders", r.data); self.assertFalse(Order.objects.exists())
+    def test_body_must_be_an_object(self):
+        for body in ([self.cart(self.gel.pk)], {"orders": "x"}, {}, "orders"):
+            r=self.post(body); self.assertEqual(r.status_code, 400, body); self.assertIn("orders", r.data)